@@ -1,3 +1,5 @@
+from typing import Sequence
+
 from pygame import Surface
 
 
@@ -6,7 +8,9 @@ class Animation:
     def static(surface: Surface) -> "Animation":
         return Animation([surface], float("Infinity"), loop=True)
 
-    def __init__(self, frames: list[Surface], delay: float, loop: bool = False) -> None:
+    def __init__(
+        self, frames: Sequence[Surface], delay: float, loop: bool = False
+    ) -> None:
         self.frames = frames
         self.delay = delay
         self.current_frame = 0
@@ -0,0 +1,155 @@
+"""
+Preprocessed asset pack.
+
+The pack is a single file holding every sprite sheet of the asset folders packed into
+one atlas of raw BGRA pixels, plus a JSON index with the position of each sheet in the
+atlas and the position of its non-blank slices in the sheet. Loading it memory-maps the
+pixel data straight into a surface, skipping PNG decoding and blank slice detection.
+
+Build it with:
+
+    python asset_pack.py
+"""
+
+import json
+import mmap
+import os
+import struct
+
+import pygame
+
+DEFAULT_PACK = "assets.pack"
+MAGIC = b"SDMPACK1"
+# Magic, index length; the pixel data starts at the next multiple of ALIGNMENT
+HEADER = struct.Struct("<8sI")
+ALIGNMENT = 16
+
+
+def asset_files(folders: list[str]) -> list[tuple[str, str, tuple[int, int]]]:
+    """The (key, path, slice dimensions) of each sprite sheet in the given folders."""
+    result = []
+    for folder in folders:
+        files = [
+            os.path.join(folder, f)
+            for f in sorted(os.listdir(folder))
+            if os.path.isfile(os.path.join(folder, f))
+        ]
+        png_files = [f for f in files if f.endswith(".png")]
+        for name in png_files:
+            key = os.path.basename(name)[0:-4]
+            dim = (16, 16)
+            if key.endswith("_32"):
+                key = key[0:-3]
+                dim = (32, 32)
+            result.append((key, name, dim))
+    return result
+
+
+def _shelf_pack(sizes: list[tuple[int, int]]) -> tuple[list[pygame.Rect], int, int]:
+    """Places rectangles of the given sizes in rows, tallest first."""
+    width = max([256] + [w for w, _ in sizes])
+    rects = [pygame.Rect(0, 0, w, h) for w, h in sizes]
+    x = y = row_height = 0
+    for rect in sorted(rects, key=lambda r: r.height, reverse=True):
+        if x + rect.width > width:
+            x, y, row_height = 0, y + row_height, 0
+        rect.topleft = (x, y)
+        x += rect.width
+        row_height = max(row_height, rect.height)
+    return rects, width, y + row_height
+
+
+def build(folders: list[str], path: str = DEFAULT_PACK) -> None:
+    # Imported here because surface_factory imports this module
+    from surface_factory import slice_image
+
+    assets = asset_files(folders)
+    images = [pygame.image.load(name) for _, name, _ in assets]
+    rects, width, height = _shelf_pack([image.get_size() for image in images])
+    atlas = pygame.Surface((width, height), pygame.SRCALPHA)
+    entries = dict()
+    for (key, _, dim), image, rect in zip(assets, images, rects):
+        atlas.blit(image, rect, special_flags=pygame.BLEND_RGBA_MAX)
+        entries[key] = {
+            "rect": list(rect),
+            "slices": [
+                [*s.get_offset(), *s.get_size()] for s in slice_image(image, *dim)
+            ],
+        }
+    index = json.dumps(
+        {"folders": folders, "size": [width, height], "entries": entries}
+    ).encode()
+    offset = -(-(HEADER.size + len(index)) // ALIGNMENT) * ALIGNMENT
+    with open(path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, len(index)))
+        f.write(index)
+        f.write(b"\0" * (offset - HEADER.size - len(index)))
+        f.write(pygame.image.tobytes(atlas, "BGRA"))
+
+
+def is_fresh(path: str, folders: list[str]) -> bool:
+    """Whether the pack exists and is newer than the assets it was built from."""
+    if not os.path.isfile(path):
+        return False
+    pack_time = os.path.getmtime(path)
+    return all(
+        os.path.getmtime(name) <= pack_time for _, name, _ in asset_files(folders)
+    )
+
+
+class AssetPack:
+    def __init__(self, path: str) -> None:
+        with open(path, "rb") as f:
+            magic, index_length = HEADER.unpack(f.read(HEADER.size))
+            if magic != MAGIC:
+                raise ValueError(f"{path} is not an asset pack")
+            index = json.loads(f.read(index_length))
+            offset = -(-(HEADER.size + index_length) // ALIGNMENT) * ALIGNMENT
+            try:
+                # Copy on write mapping: pages are read on demand and never written back
+                self._buffer: mmap.mmap | bytes = mmap.mmap(
+                    f.fileno(), 0, access=mmap.ACCESS_COPY
+                )
+            except (OSError, ValueError):
+                # No mmap support (e.g. in the browser)
+                f.seek(0)
+                self._buffer = f.read()
+        self.folders: list[str] = index["folders"]
+        size = tuple(index["size"])
+        pixels = memoryview(self._buffer)[offset : offset + size[0] * size[1] * 4]
+        self.atlas = pygame.image.frombuffer(pixels, size, "BGRA")
+        if pygame.display.get_surface() is not None:
+            display_format = pygame.Surface((1, 1), pygame.SRCALPHA).convert_alpha()
+            if self.atlas.get_masks() != display_format.get_masks():
+                self.atlas = self.atlas.convert_alpha()
+        self.entries: dict[str, dict] = index["entries"]
+
+    def raw_surface(self, key: str) -> pygame.Surface:
+        return self.atlas.subsurface(pygame.Rect(self.entries[key]["rect"]))
+
+    def slices(self, raw_surface: pygame.Surface, key: str) -> list[pygame.Surface]:
+        return [
+            raw_surface.subsurface(pygame.Rect(rect))
+            for rect in self.entries[key]["slices"]
+        ]
+
+
+if __name__ == "__main__":
+    # Only needed here, the game imports this module at startup
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        prog="asset_pack.py", description="Build the preprocessed asset pack"
+    )
+    parser.add_argument(
+        "folders",
+        nargs="*",
+        default=["assets"],
+        help="Asset folders to pack (assets if omitted)",
+    )
+    parser.add_argument(
+        "-o", "--output", default=DEFAULT_PACK, help=f"Pack file ({DEFAULT_PACK})"
+    )
+    args = parser.parse_args()
+    build(args.folders, args.output)
+    print(f"{args.output}: {os.path.getsize(args.output)} bytes")
@@ -0,0 +1,512 @@
+import argparse
+import itertools
+import os
+import random
+import sys
+import time
+from typing import Callable
+
+import pygame
+
+import asset_pack
+from animation import Animation
+from canvas import SurfaceCanvas
+from engine import StraightTrajectoryProvider, TrajectorySprite
+from enemy import InsectEnemy
+from game_assets import GameAssets
+from particles import ParticleSystem
+from render_thread import RecordingCanvas, RenderThread
+from shooter_game import ShooterGame
+from surface_cache import rotation_cache, white_out_cache
+from surface_factory import SurfaceFactory, normalize, slice_image, trim, white_out
+from surface_memory import memory
+from upscaler import Upscaler
+
+
+def measure(fn: Callable[[], object], repeat: int) -> float:
+    """Best wall clock time of `repeat` runs, in milliseconds."""
+    best = float("Infinity")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000.0
+
+
+def report(name: str, ms: float, baseline: float | None = None) -> None:
+    speedup = f" ({baseline / ms:.1f}x)" if baseline else ""
+    print(f"{name:<24} {ms:9.3f} ms{speedup}")
+
+
+def bench_load(args: argparse.Namespace) -> None:
+    folders = args.folders
+    asset_pack.build(folders, args.pack)
+    png = measure(lambda: SurfaceFactory(folders, None, lazy=False), args.repeat)
+    report("PNG files", png)
+    for workers in range(2, args.workers + 1):
+        threaded = measure(
+            lambda: SurfaceFactory(folders, None, lazy=False, workers=workers),
+            args.repeat,
+        )
+        report(f"PNG files, {workers} workers", threaded, png)
+    indexed = measure(
+        lambda: SurfaceFactory(folders, None, lazy=False, indexed=True), args.repeat
+    )
+    report("PNG files, 8-bit", indexed, png)
+    pack = measure(lambda: SurfaceFactory(folders, args.pack, lazy=False), args.repeat)
+    report("asset pack", pack, png)
+    lazy = measure(lambda: SurfaceFactory(folders, None), args.repeat)
+    report("lazy (nothing loaded)", lazy, png)
+
+
+def bench_blit(args: argparse.Namespace) -> None:
+    screen = pygame.Surface((288, 288)).convert()
+    factory = SurfaceFactory(
+        args.folders, lazy=False, indexed=args.indexed, normalized=False
+    )
+    print(f"{'':<24} {'as loaded':>12} {'normalized':>12}")
+    for name in args.assets or factory.keys:
+        frames = list(factory.surfaces[name])
+        rotated = [pygame.transform.rotate(frame, 33.0) for frame in frames]
+        for label, surfaces in ((name, frames), (f"{name}, rotated", rotated)):
+            # Each frame a hundred times, spread over the screen
+            positions = [(i * 7 % 256, i * 13 % 256) for i in range(100)]
+            before = [(s, pos) for s in surfaces for pos in positions]
+            after = [(normalize(s), pos) for s, pos in before]
+            plain_ms = measure(lambda: screen.blits(before, False), args.repeat)
+            normalized_ms = measure(lambda: screen.blits(after, False), args.repeat)
+            print(
+                f"{label:<24} {plain_ms:9.3f} ms {normalized_ms:9.3f} ms "
+                f"({plain_ms / normalized_ms:.1f}x)"
+            )
+
+
+class StillSprite(pygame.sprite.Sprite):
+    def __init__(self, image: pygame.Surface, position: tuple[int, int]) -> None:
+        super().__init__()
+        self.image = image
+        self.rect = image.get_rect(topleft=position)
+
+
+def bench_draw(args: argparse.Namespace) -> None:
+    screen = pygame.Surface((288, 288)).convert()
+    factory = SurfaceFactory(args.folders, lazy=False)
+    frames = [frame for name in args.assets for frame in factory.surfaces[name]]
+    # The sprites spread over as many groups as the game draws
+    groups: list[pygame.sprite.AbstractGroup] = [
+        pygame.sprite.RenderPlain() for _ in range(args.groups)
+    ]
+    for i in range(args.sprites):
+        sprite = StillSprite(frames[i % len(frames)], (i * 7 % 280, i * 13 % 280))
+        sprite.add(groups[i % len(groups)])
+    print(f"{args.sprites} sprites in {len(groups)} groups")
+
+    def draw_groups() -> None:
+        for group in groups:
+            group.draw(screen)
+
+    canvas = SurfaceCanvas(screen)
+
+    def draw_queue() -> None:
+        for group in groups:
+            canvas.queue_sprites(group)
+        canvas.flush()
+
+    groups_ms = measure(draw_groups, args.repeat)
+    report("group.draw per group", groups_ms)
+    report("render queue", measure(draw_queue, args.repeat), groups_ms)
+
+
+def bench_particles(args: argparse.Namespace) -> None:
+    screen = pygame.Surface((288, 288)).convert()
+    factory = SurfaceFactory(args.folders, lazy=False)
+    frames = factory.ping_pong("explosion")
+    dt = 1 / 60
+    # Explosions spread over the screen, flying in every direction
+    starts = [((i * 7 % 256, i * 13 % 256), i * 37.0 % 360) for i in range(args.count)]
+
+    def sprites() -> None:
+        group: pygame.sprite.AbstractGroup = pygame.sprite.RenderPlain()
+        for position, angle in starts:
+            trajectory = StraightTrajectoryProvider(position, None, angle, 40.0)
+            TrajectorySprite(
+                Animation(frames, 0.03), None, trajectory, group
+            ).on_animation_end(lambda s: s.kill())
+        while group:
+            group.update(dt)
+            group.draw(screen)
+
+    canvas = SurfaceCanvas(screen)
+
+    def particles() -> None:
+        system = ParticleSystem()
+        kind = system.add_kind(frames, 0.03)
+        for position, angle in starts:
+            velocity = pygame.Vector2(1, 0).rotate(angle) * 40.0
+            system.emit(kind, position, (velocity.x, velocity.y))
+        while system:
+            system.update(dt)
+            system.queue(canvas)
+            canvas.flush()
+
+    print(f"{args.count} explosions, from creation until they're over")
+    sprites_ms = measure(sprites, args.repeat)
+    report("sprites", sprites_ms)
+    report("particles", measure(particles, args.repeat), sprites_ms)
+
+
+def bench_render(args: argparse.Namespace) -> None:
+    size = (288, 288)
+    assets = GameAssets(args.folders)
+    display = pygame.Surface((round(288 * args.scale), round(288 * args.scale)))
+    start = [
+        [pygame.event.Event(pygame.KEYDOWN, unicode=" ", key=pygame.K_SPACE)],
+        [pygame.event.Event(pygame.KEYUP, unicode=" ", key=pygame.K_SPACE)],
+    ]
+
+    def play(threaded: bool) -> None:
+        upscaler = Upscaler(display, size, args.scale)
+        recording = RecordingCanvas() if threaded else None
+        render_thread = RenderThread(size, upscaler) if threaded else None
+        game = ShooterGame(
+            None, size, args.scale, args.folders, assets=assets, canvas=recording
+        )
+        random.seed(0)
+        for frame in range(args.frames):
+            events = start[frame - 1] if 1 <= frame <= 2 else []
+            try:
+                game.update(events, 1 / 60, 60.0)
+            except StopIteration:
+                break
+            if render_thread is not None and recording is not None:
+                render_thread.finish()
+                render_thread.submit(recording.take(), game.dirty_rects)
+            else:
+                upscaler.update(game.screen, game.dirty_rects)
+        if render_thread is not None:
+            render_thread.stop()
+
+    print(f"{args.frames} frames scaled by {args.scale}, {os.cpu_count()} CPUs")
+    serial = measure(lambda: play(False), args.repeat) / args.frames
+    report("serial, per frame", serial)
+    report(
+        "render thread, per frame",
+        measure(lambda: play(True), args.repeat) / args.frames,
+        serial,
+    )
+
+
+def bench_stage(args: argparse.Namespace) -> None:
+    size = (288, 288)
+    assets = GameAssets(args.folders)
+    start = [
+        [pygame.event.Event(pygame.KEYDOWN, unicode=" ", key=pygame.K_SPACE)],
+        [pygame.event.Event(pygame.KEYUP, unicode=" ", key=pygame.K_SPACE)],
+    ]
+
+    def play(screens: int, culled: bool) -> float:
+        """Milliseconds per frame, not counting the setup."""
+        height = size[1] * screens
+        game = ShooterGame(
+            None,
+            size,
+            1.0,
+            args.folders,
+            assets=assets,
+            world_size=(size[0], height),
+            scroll_speed=120.0,
+        )
+        # Enemies drifting down, spread evenly over the whole stage
+        count = args.density * screens
+        for i in range(count):
+            position = (16 + i * 37 % 256, height - i * height // count)
+            trajectory = StraightTrajectoryProvider(position, None, 90.0, 10.0)
+            enemy = InsectEnemy(
+                game.factory,
+                i % 4,
+                trajectory,
+                game.player_group,
+                game.enemy_bullet_group,
+                game.enemy_group,
+            )
+            enemy.shooting_enabled = False
+            if culled:
+                game.place(enemy)
+        random.seed(0)
+        begin = time.perf_counter()
+        for frame in range(args.frames):
+            events = start[frame - 1] if 1 <= frame <= 2 else []
+            game.update(events, 1 / 60, 60.0)
+        return (time.perf_counter() - begin) * 1000.0 / args.frames
+
+    print(f"{args.density} enemies per screen, {args.frames} frames")
+    print(f"{'screens':<8} {'enemies':>8} {'all updated':>14} {'culled':>12}")
+    for screens in args.screens:
+        every_ms = min(play(screens, False) for _ in range(args.repeat))
+        culled_ms = min(play(screens, True) for _ in range(args.repeat))
+        print(
+            f"{screens:<8} {args.density * screens:>8} {every_ms:11.3f} ms "
+            f"{culled_ms:9.3f} ms ({every_ms / culled_ms:.1f}x)"
+        )
+
+
+# The per-pixel versions slice_image, trim and white_out replaced, kept as a reference
+def reference_slice_image(
+    image: pygame.Surface, target_width: int, target_height: int
+) -> list[pygame.Surface]:
+    height = min(target_height, image.get_height())
+    width = min(target_width, image.get_width())
+    slices = []
+    for y in range(0, image.get_height(), height):
+        for x in range(0, image.get_width(), width):
+            slice = image.subsurface(pygame.Rect(x, y, width, height))
+            found = False
+            # skip blank slices
+            for pixel_x in range(slice.get_width()):
+                for pixel_y in range(slice.get_height()):
+                    if slice.get_at((pixel_x, pixel_y))[3] != 0:
+                        found = True
+            if found:
+                slices.append(slice)
+    return slices
+
+
+def reference_trim(image: pygame.Surface) -> pygame.Surface:
+    left = 0
+    right = image.get_width()
+    top = 0
+    bottom = image.get_height()
+    for x in range(image.get_width()):
+        for y in range(image.get_height()):
+            if image.get_at((x, y))[3] != 0:
+                left = x
+                break
+        if left != 0:
+            break
+    for x in range(image.get_width() - 1, -1, -1):
+        for y in range(image.get_height()):
+            if image.get_at((x, y))[3] != 0:
+                right = x
+                break
+        if right != image.get_width():
+            break
+    for y in range(image.get_height()):
+        for x in range(image.get_width()):
+            if image.get_at((x, y))[3] != 0:
+                top = y
+                break
+        if top != 0:
+            break
+    for y in range(image.get_height() - 1, -1, -1):
+        for x in range(image.get_width()):
+            if image.get_at((x, y))[3] != 0:
+                bottom = y
+                break
+        if bottom != image.get_height():
+            break
+    return image.subsurface(pygame.Rect(left, top, right - left, bottom - top))
+
+
+def reference_white_out(original_surface: pygame.Surface) -> pygame.Surface:
+    white_surface = pygame.Surface(original_surface.get_size(), pygame.SRCALPHA)
+    for x in range(original_surface.get_width()):
+        for y in range(original_surface.get_height()):
+            color = original_surface.get_at((x, y))
+            if color.a != 0:
+                white_surface.set_at((x, y), pygame.Color(255, 255, 255, color.a))
+    return white_surface
+
+
+def same_surface(a: pygame.Surface, b: pygame.Surface) -> bool:
+    return (
+        a.get_abs_offset() == b.get_abs_offset()
+        and a.get_size() == b.get_size()
+        and pygame.image.tobytes(a, "RGBA") == pygame.image.tobytes(b, "RGBA")
+    )
+
+
+def bench_verify(args: argparse.Namespace) -> None:
+    checked = 0
+    mismatches = []
+    for key, name, dim in asset_pack.asset_files(args.folders):
+        loaded = pygame.image.load(name)
+        images = ((key, loaded), (f"{key}, alpha", loaded.convert_alpha()))
+        # The game's slice size and the other ones dividing the sheet, for more cases
+        sizes = sorted(
+            {dim}
+            | {
+                (n, n)
+                for n in (8, 16, 32)
+                if loaded.get_width() % n == 0 and loaded.get_height() % n == 0
+            }
+        )
+        for (label, image), size in itertools.product(images, sizes):
+            label = f"{label}, {size[0]}x{size[1]}"
+            expected = reference_slice_image(image, *size)
+            actual = list(slice_image(image, *size))
+            if len(actual) != len(expected) or not all(
+                same_surface(a, e) for a, e in zip(actual, expected)
+            ):
+                mismatches.append(f"{label}: slices")
+                continue
+            for i, slice in enumerate(actual):
+                checked += 1
+                if not same_surface(trim(slice), reference_trim(slice)):
+                    mismatches.append(f"{label} {i}: trim")
+                if not same_surface(white_out(slice), reference_white_out(slice)):
+                    mismatches.append(f"{label} {i}: white_out")
+    for mismatch in mismatches:
+        print(f"Differs from the reference: {mismatch}")
+    print(f"{checked} slices checked, {len(mismatches)} differences")
+    if mismatches:
+        sys.exit(1)
+
+
+def bench_memory(args: argparse.Namespace) -> None:
+    memory.budget = args.budget * 1024
+    factory = SurfaceFactory(args.folders, lazy=False, indexed=args.indexed)
+    frames = [frame for name in factory.keys for frame in factory.surfaces[name]]
+    angles = range(0, 360, args.step)
+    print(f"{len(frames)} frames, {len(angles)} angles")
+    fill = measure(
+        lambda: [
+            rotation_cache.rotate(white_out_cache.white_out(frame), angle)
+            for frame in frames
+            for angle in angles
+        ],
+        args.repeat,
+    )
+    report("rotate + white-out", fill)
+    print(rotation_cache)
+    print(white_out_cache)
+    print(memory.report())
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        prog="benchmark.py", description="Micro benchmarks for the game internals"
+    )
+    parser.add_argument(
+        "-r", "--repeat", type=int, default=20, help="Runs per measurement (20)"
+    )
+    subparsers = parser.add_subparsers(required=True)
+    load = subparsers.add_parser(
+        "load", help="SurfaceFactory construction from PNG files vs the asset pack"
+    )
+    load.add_argument("folders", nargs="*", default=["assets"])
+    load.add_argument(
+        "--pack",
+        default=asset_pack.DEFAULT_PACK,
+        help=f"Pack file, rebuilt before measuring ({asset_pack.DEFAULT_PACK})",
+    )
+    load.add_argument(
+        "-w",
+        "--workers",
+        type=int,
+        default=os.cpu_count() or 1,
+        help="Also load the PNG files with 2..WORKERS threads (CPU count)",
+    )
+    load.set_defaults(func=bench_load)
+    blit = subparsers.add_parser(
+        "blit", help="Blitting the frames of each asset as loaded vs normalized"
+    )
+    blit.add_argument("assets", nargs="*", help="Assets to blit (all if omitted)")
+    blit.add_argument("--folders", nargs="+", default=["assets"])
+    blit.add_argument(
+        "--indexed", action="store_true", help="Load the sheets as 8-bit surfaces"
+    )
+    blit.set_defaults(func=bench_blit)
+    draw = subparsers.add_parser(
+        "draw", help="Drawing sprite groups one by one vs through the render queue"
+    )
+    draw.add_argument(
+        "assets",
+        nargs="*",
+        default=["bullet", "bullet-2", "shots"],
+        help="Sprite frames",
+    )
+    draw.add_argument("--folders", nargs="+", default=["assets"])
+    draw.add_argument(
+        "-n", "--sprites", type=int, default=300, help="Number of sprites (300)"
+    )
+    draw.add_argument(
+        "-g", "--groups", type=int, default=7, help="Number of groups (7)"
+    )
+    draw.set_defaults(func=bench_draw)
+    particles_parser = subparsers.add_parser(
+        "particles", help="Explosions as sprites vs as particles"
+    )
+    particles_parser.add_argument("folders", nargs="*", default=["assets"])
+    particles_parser.add_argument(
+        "-n", "--count", type=int, default=100, help="Number of explosions (100)"
+    )
+    particles_parser.set_defaults(func=bench_particles)
+    render = subparsers.add_parser(
+        "render", help="Playing the game with and without the render thread"
+    )
+    render.add_argument("folders", nargs="*", default=["assets"])
+    render.add_argument(
+        "-f", "--frames", type=int, default=600, help="Frames to play (600)"
+    )
+    render.add_argument(
+        "-s", "--scale", type=float, default=3.0, help="Scale factor (3)"
+    )
+    render.set_defaults(func=bench_render)
+    stage = subparsers.add_parser(
+        "stage",
+        help="Playing stages of growing length, with every enemy updated vs only "
+        "the ones near the camera",
+    )
+    stage.add_argument("folders", nargs="*", default=["assets"])
+    stage.add_argument(
+        "-d",
+        "--density",
+        type=int,
+        default=20,
+        help="Enemies per screen of stage (20)",
+    )
+    stage.add_argument(
+        "--screens",
+        type=int,
+        nargs="+",
+        default=[1, 10, 100],
+        help="Stage lengths in screens (1 10 100)",
+    )
+    stage.add_argument(
+        "-f", "--frames", type=int, default=300, help="Frames to play (300)"
+    )
+    stage.set_defaults(func=bench_stage)
+    verify = subparsers.add_parser(
+        "verify",
+        help="Check slice_image, trim and white_out against their per-pixel "
+        "reference versions on every sprite sheet",
+    )
+    verify.add_argument("folders", nargs="*", default=["assets"])
+    verify.set_defaults(func=bench_verify)
+    memory_parser = subparsers.add_parser(
+        "memory",
+        help="Pixel memory held by the caches after rotating and whiting out "
+        "every frame",
+    )
+    memory_parser.add_argument("folders", nargs="*", default=["assets"])
+    memory_parser.add_argument(
+        "-s", "--step", type=int, default=15, help="Rotation step in degrees (15)"
+    )
+    memory_parser.add_argument(
+        "-b",
+        "--budget",
+        type=int,
+        default=0,
+        help="Memory budget of the derived surfaces in KB (no limit)",
+    )
+    memory_parser.add_argument(
+        "--indexed", action="store_true", help="Load the sheets as 8-bit surfaces"
+    )
+    memory_parser.set_defaults(func=bench_memory)
+    args = parser.parse_args()
+
+    pygame.init()
+    # The factory converts surfaces to the display format, so there must be a display
+    pygame.display.set_mode((1, 1), pygame.HIDDEN)
+    args.func(args)
+    pygame.quit()
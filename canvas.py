@@ -0,0 +1,234 @@
+"""
+Where the game composes its frames.
+
+The default backend blits the sprites onto the low resolution screen surface, which
+is then scaled into the display. Set RENDER_BACKEND=texture to compose them with the
+SDL2 renderer instead: every image is uploaded once as a texture, and the renderer
+rotates the sprites and scales the frame into the window while drawing. Without
+renderer support (e.g. in the browser) the game falls back to the surface backend.
+"""
+
+import os
+import weakref
+from typing import Iterable, Protocol
+
+import pygame
+
+from engine import AnimatedSprite
+
+RENDER_BACKEND = os.getenv("RENDER_BACKEND", "surface").lower()
+
+
+def points_bounds(points: list[tuple[int, int]]) -> pygame.Rect:
+    """Smallest rect covering the pixels at the points."""
+    xs, ys = [x for x, _ in points], [y for _, y in points]
+    return pygame.Rect(min(xs), min(ys), max(xs) - min(xs) + 1, max(ys) - min(ys) + 1)
+
+
+class Canvas(Protocol):
+    """
+    Surfaces are either drawn right away (blit, fill) or queued and drawn together
+    by flush, in one batch. Flush before drawing right away what must go on top.
+    """
+
+    def blit(
+        self,
+        surface: pygame.Surface,
+        dest: tuple[int, int] | pygame.Rect,
+        area: pygame.Rect | None = None,
+    ) -> pygame.Rect:
+        """Same as Surface.blit."""
+        ...
+
+    def fill(self, color: tuple[int, int, int], rect: pygame.Rect) -> pygame.Rect:
+        """Same as Surface.fill, with a mandatory area."""
+        ...
+
+    def rect(self, color: tuple[int, int, int], rect: pygame.Rect) -> pygame.Rect:
+        """Draws the outline of the rect, one pixel wide."""
+        ...
+
+    def lines(
+        self, color: tuple[int, int, int], points: list[tuple[int, int]]
+    ) -> pygame.Rect:
+        """Draws connected line segments through the points (at least 2)."""
+        ...
+
+    def queue(self, surface: pygame.Surface, dest: tuple[int, int]) -> None:
+        """Queues a surface to be drawn by the next flush."""
+        ...
+
+    def queue_sprites(
+        self, group: pygame.sprite.AbstractGroup, offset: tuple[int, int] = (0, 0)
+    ) -> None:
+        """
+        Queues the sprites of the group to be drawn by the next flush, at their
+        position minus the offset.
+        """
+        ...
+
+    def flush(self) -> list[pygame.Rect]:
+        """Draws everything queued, in order, returning the areas drawn."""
+        ...
+
+
+class SurfaceCanvas:
+    def __init__(self, surface: pygame.Surface) -> None:
+        self.surface = surface
+        self._queue: list[tuple[pygame.Surface, tuple[int, int] | pygame.Rect]] = []
+
+    def blit(
+        self,
+        surface: pygame.Surface,
+        dest: tuple[int, int] | pygame.Rect,
+        area: pygame.Rect | None = None,
+    ) -> pygame.Rect:
+        return self.surface.blit(surface, dest, area)
+
+    def fill(self, color: tuple[int, int, int], rect: pygame.Rect) -> pygame.Rect:
+        return self.surface.fill(color, rect)
+
+    def rect(self, color: tuple[int, int, int], rect: pygame.Rect) -> pygame.Rect:
+        return pygame.draw.rect(self.surface, color, rect, 1)
+
+    def lines(
+        self, color: tuple[int, int, int], points: list[tuple[int, int]]
+    ) -> pygame.Rect:
+        return pygame.draw.lines(self.surface, color, False, points)
+
+    def queue(self, surface: pygame.Surface, dest: tuple[int, int]) -> None:
+        self._queue.append((surface, dest))
+
+    def queue_sprites(
+        self, group: pygame.sprite.AbstractGroup, offset: tuple[int, int] = (0, 0)
+    ) -> None:
+        if offset == (0, 0):
+            self._queue.extend((s.image, s.rect) for s in group.sprites())
+        else:
+            x, y = offset
+            self._queue.extend((s.image, s.rect.move(-x, -y)) for s in group.sprites())
+
+    def flush(self) -> list[pygame.Rect]:
+        if not self._queue:
+            return []
+        drawn = self.surface.blits(self._queue)
+        self._queue = []
+        return drawn or []
+
+
+class TextureCanvas:
+    """
+    Draws on an SDL2 renderer at the game resolution, scaled by the renderer.
+
+    Textures are kept for as long as their surfaces live, so the surfaces drawn must
+    not change afterwards: the cached sprite frames and text renders never do.
+    """
+
+    def __init__(self, renderer, scale_factor: float) -> None:
+        from pygame._sdl2.video import Texture
+
+        self.renderer = renderer
+        self.scale_factor = scale_factor
+        self._texture_class = Texture
+        self._textures: weakref.WeakKeyDictionary[pygame.Surface, Texture] = (
+            weakref.WeakKeyDictionary()
+        )
+        # (image, rect, angle as in pygame.transform.rotate) to draw on the next flush
+        self._queue: list[tuple[pygame.Surface, pygame.Rect, float]] = []
+        # The sprites keep their images upright, the renderer rotates them
+        AnimatedSprite.rotate_images = False
+        self._begin_frame()
+
+    def _texture(self, surface: pygame.Surface):
+        texture = self._textures.get(surface)
+        if texture is None:
+            texture = self._texture_class.from_surface(self.renderer, surface)
+            self._textures[surface] = texture
+        return texture
+
+    def _begin_frame(self) -> None:
+        self.renderer.scale = (self.scale_factor, self.scale_factor)
+        self.renderer.draw_color = (0, 0, 0, 255)
+        self.renderer.clear()
+
+    def blit(
+        self,
+        surface: pygame.Surface,
+        dest: tuple[int, int] | pygame.Rect,
+        area: pygame.Rect | None = None,
+    ) -> pygame.Rect:
+        rect = pygame.Rect(dest[0], dest[1], *(area or surface.get_rect()).size)
+        # There are no empty textures
+        if rect.width > 0 and rect.height > 0:
+            self._texture(surface).draw(area, rect)
+        return rect
+
+    def fill(self, color: tuple[int, int, int], rect: pygame.Rect) -> pygame.Rect:
+        self.renderer.draw_color = pygame.Color(color)
+        self.renderer.fill_rect(rect)
+        return pygame.Rect(rect)
+
+    def rect(self, color: tuple[int, int, int], rect: pygame.Rect) -> pygame.Rect:
+        self.renderer.draw_color = pygame.Color(color)
+        self.renderer.draw_rect(rect)
+        return pygame.Rect(rect)
+
+    def lines(
+        self, color: tuple[int, int, int], points: list[tuple[int, int]]
+    ) -> pygame.Rect:
+        self.renderer.draw_color = pygame.Color(color)
+        for start, end in zip(points, points[1:]):
+            self.renderer.draw_line(start, end)
+        return points_bounds(points)
+
+    def queue(self, surface: pygame.Surface, dest: tuple[int, int]) -> None:
+        self._queue.append((surface, pygame.Rect(dest, surface.get_size()), 0.0))
+
+    def queue_sprites(
+        self, group: pygame.sprite.AbstractGroup, offset: tuple[int, int] = (0, 0)
+    ) -> None:
+        x, y = offset
+        for sprite in group.sprites():
+            angle = getattr(sprite, "image_angle", 0.0)
+            self._queue.append((sprite.image, sprite.rect.move(-x, -y), angle))
+
+    def flush(self) -> list[pygame.Rect]:
+        # SDL has no batched texture copy, but the textures are already uploaded
+        drawn = []
+        for image, rect, angle in self._queue:
+            drawn.append(rect)
+            if image.get_width() == 0 or image.get_height() == 0:
+                continue
+            if angle:
+                # The renderer turns clockwise, pygame.transform.rotate doesn't
+                dest = image.get_rect(center=rect.center)
+                self._texture(image).draw(None, dest, -angle)
+            else:
+                self._texture(image).draw(None, rect.topleft)
+        self._queue = []
+        return drawn
+
+    def present(
+        self, overlays: Iterable[tuple[pygame.Surface, tuple[int, int]]] = ()
+    ) -> None:
+        """Shows the frame, with the overlays drawn at the window resolution on top."""
+        self.renderer.scale = (1.0, 1.0)
+        for surface, dest in overlays:
+            self._texture(surface).draw(None, dest)
+        self.renderer.present()
+        self._begin_frame()
+
+
+def create_renderer(title: str, size: tuple[int, int]):
+    """Opens a window with an SDL2 renderer, None if it isn't supported."""
+    try:
+        from pygame._sdl2.video import Renderer, Window
+
+        renderer = Renderer(Window(title, size))
+    except (ImportError, pygame.error) as e:
+        print(f"Texture backend not available, using surfaces: {e}")
+        return None
+    # The renderer can't share the window of the display module, but converting
+    # surfaces to the display format still needs a display mode
+    pygame.display.set_mode((1, 1), pygame.HIDDEN)
+    return renderer
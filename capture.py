@@ -0,0 +1,113 @@
+"""
+Session capture.
+
+Each captured frame is copied into one of a fixed ring of preallocated surfaces and
+handed to a writer thread, which saves it to disk and gives the surface back. The
+game never waits for the disk: if every surface is still waiting to be written, the
+frame is dropped and counted instead.
+
+Frames are written to a new directory per session, either as numbered PNG files or
+appended to a single raw file of pixels in the surface format (described in a text
+file next to it). Dropped frames leave gaps in the PNG numbering. Stopping doesn't wait
+either: the writer finishes the pending frames and reports on its own.
+"""
+
+import os
+import queue
+import threading
+import time
+
+import pygame
+
+# Capture from the start, otherwise toggled with F9
+CAPTURE = os.getenv("CAPTURE", "False").lower() in ("true", "1", "t")
+CAPTURE_DIR = os.getenv("CAPTURE_DIR", "captures")
+CAPTURE_FORMAT = os.getenv("CAPTURE_FORMAT", "png").lower()
+CAPTURE_BUFFERS = int(os.getenv("CAPTURE_BUFFERS", 32))
+CAPTURE_KEY = pygame.K_F9
+
+
+class FrameCapture:
+    def __init__(
+        self,
+        size: tuple[int, int],
+        directory: str,
+        format: str = CAPTURE_FORMAT,
+        buffers: int = CAPTURE_BUFFERS,
+    ) -> None:
+        if format not in ("png", "raw"):
+            raise ValueError(f"Unknown capture format {format}")
+        self.directory = directory
+        self.format = format
+        self.frames = 0
+        self.written = 0
+        self.dropped = 0
+        os.makedirs(directory, exist_ok=True)
+        # Surfaces ready to be copied into, and (frame number, surface) to be written
+        self._free: queue.Queue[pygame.Surface] = queue.Queue()
+        self._pending: queue.Queue[tuple[int, pygame.Surface] | None] = queue.Queue()
+        for _ in range(buffers):
+            self._free.put(pygame.Surface(size))
+        self._raw = None
+        self._stopped = False
+        if format == "raw":
+            self._raw = open(os.path.join(directory, "frames.raw"), "wb")
+            sample = self._free.queue[0]
+            with open(os.path.join(directory, "frames.txt"), "w") as f:
+                f.write(
+                    f"size {size[0]} {size[1]}\n"
+                    f"pitch {sample.get_pitch()}\n"
+                    f"bytes per pixel {sample.get_bytesize()}\n"
+                    f"masks {' '.join(hex(m) for m in sample.get_masks())}\n"
+                )
+        self._writer = threading.Thread(target=self._write, name="capture")
+        self._writer.start()
+
+    @staticmethod
+    def session(size: tuple[int, int]) -> "FrameCapture":
+        """Starts capturing into a new directory under CAPTURE_DIR."""
+        name = time.strftime("%Y%m%d-%H%M%S")
+        return FrameCapture(size, os.path.join(CAPTURE_DIR, name))
+
+    def capture(self, screen: pygame.Surface) -> None:
+        """Queues a copy of the screen to be written, or drops it if none is free."""
+        if self._stopped:
+            return
+        self.frames += 1
+        try:
+            buffer = self._free.get_nowait()
+        except queue.Empty:
+            self.dropped += 1
+            return
+        buffer.blit(screen, (0, 0))
+        self._pending.put((self.frames, buffer))
+
+    def stop(self) -> None:
+        """
+        Stops capturing without waiting: the writer writes the frames still pending,
+        closes the capture and prints a summary.
+        """
+        if not self._stopped:
+            self._stopped = True
+            self._pending.put(None)
+
+    def wait(self) -> None:
+        """Waits for the writer to finish, after stop."""
+        self._writer.join()
+
+    def _write(self) -> None:
+        while (item := self._pending.get()) is not None:
+            number, buffer = item
+            if self._raw is not None:
+                self._raw.write(buffer.get_buffer().raw)
+            else:
+                path = os.path.join(self.directory, f"frame_{number:06d}.png")
+                pygame.image.save(buffer, path)
+            self.written += 1
+            self._free.put(buffer)
+        if self._raw is not None:
+            self._raw.close()
+        print(
+            f"Captured {self.written} frames to {self.directory}, "
+            f"dropped {self.dropped} of {self.frames}"
+        )
@@ -1,6 +1,8 @@
 from typing import Self
+import math
 import os
 from abc import ABC, abstractmethod
+from collections import Counter
 from dataclasses import dataclass
 from enum import Flag, auto
 from typing import Generator, Optional
@@ -10,6 +12,7 @@ from pygame import Vector2
 from pygame.sprite import Sprite
 
 from animation import Animation
+from surface_cache import rotation_cache, white_out_cache
 
 SPRITE_DEBUG = os.getenv("SPRITE_DEBUG", "False").lower() in ("true", "1", "t")
 
@@ -31,6 +34,10 @@ class TrajectoryProvider(ABC):
     def is_finished(self) -> bool:
         pass
 
+    def get_path(self) -> list[tuple[int, int]]:
+        """Points along the rest of the trajectory (for debugging), empty if unknown."""
+        return []
+
 
 class StaticTrajectoryProvider(TrajectoryProvider):
     def __init__(self, position: tuple[int, int], angle: float) -> None:
@@ -104,6 +111,12 @@ class LinearSegmentsTrajectoryProvider(TrajectoryProvider):
     def is_finished(self) -> bool:
         return self._distance >= self._total_length
 
+    def get_path(self) -> list[tuple[int, int]]:
+        remaining = [
+            end for _, final, _, end in self._segment_lut if final > self._distance
+        ]
+        return [self.get_current_position()] + [(int(p.x), int(p.y)) for p in remaining]
+
 
 class StraightTrajectoryProvider(TrajectoryProvider):
     def __init__(
@@ -147,6 +160,11 @@ class StraightTrajectoryProvider(TrajectoryProvider):
     def is_finished(self) -> bool:
         return self.position.distance_to(Vector2(self.start)) >= self._distance
 
+    def get_path(self) -> list[tuple[int, int]]:
+        if self.end is None:
+            return []
+        return [self.get_current_position(), self.end]
+
 
 class PredefinedTrajectoryProvider(TrajectoryProvider):
     @staticmethod
@@ -190,6 +208,10 @@ class PredefinedTrajectoryProvider(TrajectoryProvider):
     def reset(self) -> None:
         self.index = 0
 
+    def get_path(self, step: int = 8) -> list[tuple[int, int]]:
+        points = self.trajectory[0]
+        return points[self.index : -1 : step] + points[-1:]
+
 
 class SeekingTrajectoryProvider(TrajectoryProvider):
     def __init__(
@@ -242,6 +264,11 @@ class SeekingTrajectoryProvider(TrajectoryProvider):
             return False
         return self.distance >= self.length
 
+    def get_path(self) -> list[tuple[int, int]]:
+        if not self.mark.alive():
+            return []
+        return [self.get_current_position(), self.mark.rect.center]
+
 
 class EvadingTrajectoryProvider(TrajectoryProvider):
     def __init__(
@@ -400,41 +427,93 @@ class MouseTrajectoryProvider(TrajectoryProvider):
         return False
 
 
+class FrameCounters:
+    """Named event counters; `last` holds the counts of the previous frame."""
+
+    def __init__(self) -> None:
+        self.current: Counter[str] = Counter()
+        self.last: Counter[str] = Counter()
+
+    def count(self, name: str, amount: int = 1) -> None:
+        self.current[name] += amount
+
+    def end_frame(self) -> None:
+        self.last = self.current
+        self.current = Counter()
+
+
+frame_counters = FrameCounters()
+
+
+def rotated_size(size: tuple[int, int], angle: float) -> tuple[int, int]:
+    """Size of the image pygame.transform.rotate would return, without rotating."""
+    width, height = size
+    angle = math.fmod(angle, 360.0)
+    if angle % 90.0 == 0.0:
+        return size if int(angle // 90.0) % 2 == 0 else (height, width)
+    radians = math.radians(angle)
+    cos_w, cos_h = math.cos(radians) * width, math.cos(radians) * height
+    sin_w, sin_h = math.sin(radians) * width, math.sin(radians) * height
+    return (
+        int(max(abs(cos_w + sin_h), abs(cos_w - sin_h))),
+        int(max(abs(sin_w + cos_h), abs(sin_w - cos_h))),
+    )
+
+
 class AnimatedSprite(Sprite):
+    # False when the renderer rotates the images while drawing them: the image is
+    # then the upright frame, to be drawn rotated by image_angle around the center
+    # of the rect
+    rotate_images = True
+
     def __init__(
         self, animation: Animation, angle_offset: float | None, *groups
     ) -> None:
         super().__init__(*groups)
         self.animation = animation
         self.angle_offset = angle_offset
-        self.image = self.animation.get_current_frame().copy()
+        self.image = self.animation.get_current_frame()
         self.rect = self.image.get_rect()
         self.rect.top = 0
         self.rect.left = 0
         self.angle = 0.0
+        self.image_angle = 0.0
         self.animation_end_handler = None
+        # While positive, the sprite is drawn as a white silhouette (hit flash)
+        self.white_out_timer = 0.0
+        # (frame, quantized angle, white out) the current image was built from
+        self._image_state: tuple | None = None
         self.__gen = self.__animation_loop()
         next(self.__gen)
 
     def _update_image(self) -> None:
-        self.image = self.animation.get_current_frame().copy()
-        # Rotate the image if necessary
+        frame = self.animation.get_current_frame()
+        angle = None
         if self.angle_offset is not None:
-            effective_angle = -self.angle + self.angle_offset
-            if effective_angle != 0.0:
-                self.image = pygame.transform.rotate(self.image, effective_angle)
-        # Debug the bounding box
-        if SPRITE_DEBUG:
-            pygame.draw.rect(self.image, "magenta", self.image.get_rect(), 1)
-            hb = self.get_hit_box()
-            hb.center = self.image.get_rect().center
-            pygame.draw.rect(self.image, "cyan", hb, 1)
-        new_rect = self.image.get_rect()
+            angle = rotation_cache.quantize(-self.angle + self.angle_offset)
+        white_out = self.white_out_timer > 0.0
+        state = (frame, angle, white_out)
+        if state == self._image_state:
+            frame_counters.count("image_skips")
+            return
+        frame_counters.count("image_rebuilds")
+        self._image_state = state
+        if white_out:
+            frame = white_out_cache.white_out(frame)
+        if self.rotate_images:
+            # Rotate the image if necessary (rotated frames are shared between sprites)
+            self.image = rotation_cache.rotate(frame, angle) if angle else frame
+            size = self.image.get_size()
+        else:
+            self.image = frame
+            self.image_angle = angle or 0.0
+            size = rotated_size(frame.get_size(), self.image_angle)
+        new_rect = pygame.Rect((0, 0), size)
         new_rect.center = self.rect.center
         self.rect = new_rect
 
     def get_hit_box(self) -> pygame.Rect:
-        return self.image.get_rect()
+        return pygame.Rect((0, 0), self.rect.size)
 
     def set_animation(
         self, animation: Animation, angle_offset: float | None = 0.0, reset_angle=False
@@ -0,0 +1,80 @@
+from functools import partial
+from typing import Callable, Generator
+
+import pygame
+
+from hud_text import HudText
+from surface_factory import SurfaceFactory
+from surface_memory import memory, surface_bytes
+
+# Sprite sheets needed to show the menu (the crosshair and the player ship)
+MENU_SHEETS = ["shots", "player-ship", "player-ship-l", "player-ship-r"]
+
+
+class GameAssets:
+    """
+    Assets of the game that don't depend on the game state (sprite sheets and their
+    derived surfaces, fonts and background). Loaded once and reused by every new game.
+    """
+
+    def __init__(self, asset_folders: list[str], load: bool = True) -> None:
+        self.factory = SurfaceFactory(asset_folders)
+        self.font: pygame.font.Font
+        self.small_font: pygame.font.Font
+        self.text: HudText
+        self.small_text: HudText
+        self.bg: pygame.Surface
+        # The background blended over black, and what it was composited from
+        self._composite: pygame.Surface | None = None
+        self._composite_key: tuple | None = None
+        memory.register("background", self._background_bytes)
+        if load:
+            for _ in self.load_menu_assets():
+                pass
+
+    def _load_fonts(self) -> None:
+        self.font = pygame.font.Font("assets/mystery-font.ttf", 12)
+        self.small_font = pygame.font.Font("assets/mystery-font.ttf", 8)
+        self.text = HudText(self.font)
+        self.small_text = HudText(self.small_font)
+
+    def _load_background(self) -> None:
+        self.bg = pygame.image.load("bg/nebula_288.png").convert()
+        self.bg.set_alpha(96)
+
+    def background(self, size: tuple[int, int]) -> pygame.Surface:
+        """
+        The background as drawn over a black screen of the given size, composited
+        into an opaque surface that can be copied as is. It's composited again only
+        if the background, its alpha or the size change.
+        """
+        key = (self.bg, self.bg.get_alpha(), size)
+        if self._composite is None or key != self._composite_key:
+            self._composite = pygame.Surface(size).convert()
+            self._composite.fill((0, 0, 0))
+            self._composite.blit(self.bg, (0, 0))
+            self._composite_key = key
+        return self._composite
+
+    def _background_bytes(self) -> int:
+        if not hasattr(self, "bg"):
+            return 0
+        composite = surface_bytes(self._composite) if self._composite else 0
+        return surface_bytes(self.bg) + composite
+
+    def load_menu_assets(self) -> Generator[float, None, None]:
+        """
+        Loads what the menu needs in small steps, yielding the progress (from 0 to 1)
+        after each one, so the caller can keep the window alive in between.
+        """
+        steps: list[Callable[[], None]] = [self._load_fonts, self._load_background]
+        steps += [partial(self.factory.preload, [key]) for key in MENU_SHEETS]
+        for i, step in enumerate(steps):
+            step()
+            yield (i + 1) / len(steps)
+
+    def load_remaining_assets(self) -> Generator[None, None, None]:
+        """Loads the other sprite sheets, one per step."""
+        for key in self.factory.keys:
+            self.factory.preload([key])
+            yield
@@ -3,7 +3,7 @@ from typing import TYPE_CHECKING, Generator
 
 import pygame
 
-from enemy import Brain, InsectEnemy, Octo, RedEnemy
+from enemy import InsectEnemy, RedEnemy
 from engine import (
     EvadingTrajectoryProvider,
     KeyboardTrajectoryProvider,
@@ -13,6 +13,7 @@ from engine import (
 )
 
 if TYPE_CHECKING:
+    from boss import Brain
     from shooter_game import ShooterGame
 
 
@@ -206,9 +207,11 @@ class GameFlow:
         self,
         state: GameState,
     ) -> None:
+        # The waves fly over the part of the world on the screen
+        ctrlpoints = [self.game.camera.to_world(p) for p in state.ctrlpoints]
         if random.random() < state.double_squadron:
             provider = LinearSegmentsTrajectoryProvider(
-                state.ctrlpoints, state.insect_speed, -8
+                ctrlpoints, state.insect_speed, -8
             )
             insect_enemy = InsectEnemy(
                 self.game.factory,
@@ -222,7 +225,7 @@ class GameFlow:
             insect_enemy.cannon_timer = state.insect_cannon_timer
 
             provider = LinearSegmentsTrajectoryProvider(
-                state.ctrlpoints, state.insect_speed, 8
+                ctrlpoints, state.insect_speed, 8
             )
             insect_enemy = InsectEnemy(
                 self.game.factory,
@@ -236,7 +239,7 @@ class GameFlow:
             insect_enemy.cannon_timer = state.insect_cannon_timer
         else:
             provider = LinearSegmentsTrajectoryProvider(
-                state.ctrlpoints, state.insect_speed, 0
+                ctrlpoints, state.insect_speed, 0
             )
             insect_enemy = InsectEnemy(
                 self.game.factory,
@@ -251,7 +254,7 @@ class GameFlow:
 
     def create_red_enemy(self, state: GameState) -> None:
         off_screen_offset = 10
-        screen_rect = self.game.screen.get_rect()
+        screen_rect = self.game.camera.rect
         initial_pos = (screen_rect.centerx, screen_rect.top - off_screen_offset)
         final_pos = (
             screen_rect.centerx,
@@ -280,8 +283,8 @@ class GameFlow:
 
     def create_bonus_red_enemy(self) -> None:
         off_screen_offset = 10
-        screen_rect = self.game.screen.get_rect()
-        random_x = random.randint(0, screen_rect.width)
+        screen_rect = self.game.camera.rect
+        random_x = random.randint(screen_rect.left, screen_rect.right)
         initial_pos = (random_x, screen_rect.top - off_screen_offset)
         final_pos = (
             random_x,
@@ -297,14 +300,39 @@ class GameFlow:
             self.game.enemy_group,
         ).on_trajectory_end(lambda s: s.kill())
 
-    def create_boss(self, state: GameState) -> list[Brain]:
+    def lay_out_stage(self, state: GameState) -> None:
+        """
+        Spreads insect enemies drifting down over the world above the camera. They're
+        placed in the stage, so they only fly and shoot once the camera gets near.
+        """
+        camera = self.game.camera
+        world = camera.world
+        for y in range(world.top + 48, camera.active_area().top, 96):
+            position = (random.randint(world.left + 16, world.right - 16), y)
+            trajectory = StraightTrajectoryProvider(position, None, 90.0, 10.0)
+            insect_enemy = InsectEnemy(
+                self.game.factory,
+                state.insect_type,
+                trajectory,
+                self.game.player_group,
+                self.game.enemy_bullet_group,
+                self.game.enemy_group,
+            )
+            insect_enemy.shot_speed = state.insect_shot_speed
+            insect_enemy.cannon_timer = state.insect_cannon_timer
+            self.game.place(insect_enemy)
+
+    def create_boss(self, state: GameState) -> list["Brain"]:
+        # Imported when first needed, the boss module isn't used by the first waves
+        from boss import Brain
+
         result: list[Brain] = []
         if state.difficulty < 40:
             return result
         elif 40 <= state.difficulty < 60:
             # one more
             trajectory = SeekingTrajectoryProvider(
-                (144, 288), 0, 20.0, 2.0, self.game.player
+                self.game.camera.to_world((144, 288)), 0, 20.0, 2.0, self.game.player
             )
             result.append(
                 Brain(
@@ -318,7 +346,7 @@ class GameFlow:
         elif 60 <= state.difficulty < 80:
             # two more
             trajectory = SeekingTrajectoryProvider(
-                (-20, 144), 0, 20.0, 2.0, self.game.player
+                self.game.camera.to_world((-20, 144)), 0, 20.0, 2.0, self.game.player
             )
             Brain(
                 self.game.factory,
@@ -328,7 +356,7 @@ class GameFlow:
                 self.game.enemy_group,
             )
             trajectory = SeekingTrajectoryProvider(
-                (288, 144), 0, 20.0, 2.0, self.game.player
+                self.game.camera.to_world((288, 144)), 0, 20.0, 2.0, self.game.player
             )
             Brain(
                 self.game.factory,
@@ -340,7 +368,7 @@ class GameFlow:
         else:
             # three more
             trajectory = SeekingTrajectoryProvider(
-                (144, 288), 0, 20.0, 2.0, self.game.player
+                self.game.camera.to_world((144, 288)), 0, 20.0, 2.0, self.game.player
             )
             result.append(
                 Brain(
@@ -352,7 +380,7 @@ class GameFlow:
                 )
             )
             trajectory = SeekingTrajectoryProvider(
-                (-20, 144), 0, 20.0, 2.0, self.game.player
+                self.game.camera.to_world((-20, 144)), 0, 20.0, 2.0, self.game.player
             )
             result.append(
                 Brain(
@@ -364,7 +392,7 @@ class GameFlow:
                 )
             )
             trajectory = SeekingTrajectoryProvider(
-                (288, 144), 0, 20.0, 2.0, self.game.player
+                self.game.camera.to_world((288, 144)), 0, 20.0, 2.0, self.game.player
             )
             result.append(
                 Brain(
@@ -384,7 +412,8 @@ class GameFlow:
             timer -= dt
 
     def _wait_enemies_to_die(self) -> Generator[None, float, None]:
-        while self.game.enemy_group:
+        # The enemies placed in the stage aren't part of the waves
+        while any(not self.game.is_placed(e) for e in self.game.enemy_group):
             yield
 
     def _wave(self, state: GameState) -> Generator[None, float, None]:
@@ -409,13 +438,17 @@ class GameFlow:
         yield from self._wait(0.5)
 
     def _intro(self) -> Generator[None, float, None]:
+        # Load the regular wave assets now rather than when the first enemy spawns
+        self.game.factory.preload(
+            ["insect-enemies", "red-enemy", "missile", "explosion", "items", "guns"]
+        )
         # Move the player ship to the center of the screen
         keyboard = self.game.player.trajectory_provider
         if not isinstance(keyboard, KeyboardTrajectoryProvider):
             raise TypeError("Expected KeyboardTrajectoryProvider")
         k_pos = keyboard.get_current_position()
         self.game.player.trajectory_provider = StraightTrajectoryProvider(
-            (k_pos[0], self.game.screen.get_height() + 10),
+            (k_pos[0], self.game.camera.rect.bottom + 10),
             (k_pos[0], k_pos[1]),
             None,
             80.0,
@@ -426,6 +459,9 @@ class GameFlow:
         self.game.player.trajectory_provider = keyboard
 
     def _boss_cut_scene(self) -> Generator[None, float, None]:
+        from boss import Brain
+
+        self.game.factory.preload(["brain-1"])
         self.game.player.disable_shooting()
         self.show_messages("Boss incoming!", "", "")
         yield from self._wait(1.0)
@@ -435,10 +471,17 @@ class GameFlow:
         if not isinstance(keyboard, KeyboardTrajectoryProvider):
             raise TypeError("Expected KeyboardTrajectoryProvider")
         self.game.player.trajectory_provider = LinearSegmentsTrajectoryProvider(
-            [self.game.player.rect.center, self.game.screen.get_rect().center], 80.0, 0
+            [self.game.player.rect.center, self.game.camera.rect.center], 80.0, 0
+        )
+        keyboard.position = pygame.Vector2(self.game.camera.rect.center)
+        trajectory = LinearSegmentsTrajectoryProvider(
+            [
+                self.game.camera.to_world((144, -16)),
+                self.game.camera.to_world((144, 32)),
+            ],
+            20.0,
+            0,
         )
-        keyboard.position = pygame.Vector2(self.game.screen.get_rect().center)
-        trajectory = LinearSegmentsTrajectoryProvider([(144, -16), (144, 32)], 20.0, 0)
         brain = Brain(
             self.game.factory,
             trajectory,
@@ -456,7 +499,7 @@ class GameFlow:
         self.show_messages()
         yield from self._wait(0.5)
         brain.trajectory_provider = SeekingTrajectoryProvider(
-            (144, 32), 90, 20.0, 2.0, self.game.player
+            self.game.camera.to_world((144, 32)), 90, 20.0, 2.0, self.game.player
         )
 
         brain.enable_shooting()
@@ -511,6 +554,10 @@ class GameFlow:
         # Intro
         yield from self._intro()
 
+        # A world taller than the screen has enemies along the way
+        if self.game.camera.world.height > self.game.camera.rect.height:
+            self.lay_out_stage(state)
+
         # Main gameplay loop
         while state.difficulty < 100:
             # Send 10 waves of enemies
@@ -533,12 +580,19 @@ class GameFlow:
             yield from self._boss_cut_scene()
             self.create_boss(state)
             yield from self._wait_enemies_to_die()
+        from boss import Octo
+
+        self.game.factory.preload(["octo", "bullet-2"])
         self.show_messages("Final boss", "", "")
         yield from self._wait(2.0)
         self.show_messages()
         yield from self._wait(0.5)
         trajectory = EvadingTrajectoryProvider(
-            (144, -16), 90, 60.0, self.game.player, pygame.Rect(18, 18, 270, 270)
+            self.game.camera.to_world((144, -16)),
+            90,
+            60.0,
+            self.game.player,
+            pygame.Rect(18, 18, 270, 270).move(self.game.camera.offset),
         )
         Octo(
             self.game.factory,
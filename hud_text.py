@@ -0,0 +1,71 @@
+"""
+HUD text rendering.
+
+Rendered strings are kept in a least recently used cache. Strings made only of the
+glyph atlas characters (enough for the score, the FPS and the progress) are composed
+by blitting glyphs rasterized once per font and color, so a changing score doesn't
+rasterize any text. Every rasterization is counted as "text_rasterizations" in the
+frame counters.
+"""
+
+import os
+
+import pygame
+
+from engine import frame_counters
+from surface_cache import SurfaceCache
+from surface_memory import memory
+
+GLYPHS = "0123456789.-:% HI"
+TEXT_CACHE_SIZE = int(os.getenv("TEXT_CACHE_SIZE", 256))
+
+text_cache = SurfaceCache(TEXT_CACHE_SIZE)
+memory.register_cache("text", text_cache)
+
+
+class HudText:
+    def __init__(self, font: pygame.font.Font, glyphs: str = GLYPHS) -> None:
+        self.font = font
+        self.glyphs = glyphs
+        # Glyph surfaces for each color, None if the font can't compose strings
+        self._atlases: dict[tuple[int, ...], dict[str, pygame.Surface] | None] = dict()
+
+    def render(self, text: str, color: str | tuple[int, int, int]) -> pygame.Surface:
+        """Same as font.render(text, False, color). Don't draw into the result."""
+        rgba = tuple(pygame.Color(color))
+        return text_cache.get((self.font, text, rgba), lambda: self._render(text, rgba))
+
+    def _render(self, text: str, color: tuple[int, ...]) -> pygame.Surface:
+        glyphs = self._glyph_atlas(color)
+        if glyphs is None or not text or any(c not in glyphs for c in text):
+            frame_counters.count("text_rasterizations")
+            return self.font.render(text, False, color)
+        surfaces = [glyphs[c] for c in text]
+        result = pygame.Surface(
+            (sum(s.get_width() for s in surfaces), surfaces[0].get_height()),
+            pygame.SRCALPHA,
+        )
+        x = 0
+        for surface in surfaces:
+            result.blit(surface, (x, 0))
+            x += surface.get_width()
+        return result
+
+    def _glyph_atlas(self, color: tuple[int, ...]) -> dict[str, pygame.Surface] | None:
+        if color not in self._atlases:
+            frame_counters.count("text_rasterizations")
+            atlas = self.font.render(self.glyphs, False, color)
+            advances = [m[4] if m else 0 for m in self.font.metrics(self.glyphs)]
+            if sum(advances) != atlas.get_width():
+                # Kerning or missing glyphs, the glyphs can't just be put side by side
+                self._atlases[color] = None
+            else:
+                glyphs = dict()
+                x = 0
+                for glyph, advance in zip(self.glyphs, advances):
+                    glyphs[glyph] = atlas.subsurface(
+                        pygame.Rect(x, 0, advance, atlas.get_height())
+                    )
+                    x += advance
+                self._atlases[color] = glyphs
+        return self._atlases[color]
@@ -2,7 +2,7 @@ import random
 
 from animation import Animation
 from engine import StraightTrajectoryProvider, TrajectorySprite
-from surface_factory import SurfaceFactory, crop, trim
+from surface_factory import SurfaceFactory
 
 
 class Item(TrajectorySprite):
@@ -20,7 +20,7 @@ class PowerCapsule(Item):
         angle: float,
         *groups,
     ):
-        animation = Animation.static(trim(factory.surfaces["items"][0]))
+        animation = Animation.static(factory.trim("items", 0))
         rotation_speed = random.choice([360, -360])
         trajectory_provider = StraightTrajectoryProvider(
             initial_pos, None, angle, 40.0, rotation_speed
@@ -37,7 +37,7 @@ class IceCream(Item):
         angle: float,
         *groups,
     ):
-        animation = Animation.static(crop(factory.surfaces["items"][1], 2, 2, 12, 14))
+        animation = Animation.static(factory.crop("items", 1, 2, 2, 12, 14))
         rotation_speed = random.choice([360, -360])
         trajectory_provider = StraightTrajectoryProvider(
             initial_pos, None, angle, 40.0, rotation_speed
@@ -3,9 +3,16 @@ import os
 import platform
 import sys
 
+# Imported first, so it can time the other imports
+from startup_trace import trace
+
 import pygame
 
-from shooter_game import ShooterGame
+from canvas import RENDER_BACKEND, TextureCanvas, create_renderer
+from capture import CAPTURE, CAPTURE_KEY, FrameCapture
+from game_assets import GameAssets
+from render_thread import RENDER_THREAD, RecordingCanvas, RenderThread
+from upscaler import Upscaler
 import engine
 
 from build_info import build_info
@@ -31,11 +38,37 @@ def draw_game_pad(display: pygame.Surface, scale_factor: float):
     pygame.draw.rect(display, rect_color, (*rect_position, *rect_size), 1)
 
 
+def draw_loading_screen(display: pygame.Surface, progress: float, scale_factor: float):
+    display.fill((0, 0, 0))
+    bar = pygame.Rect(0, 0, round(144 * scale_factor), round(5 * scale_factor))
+    bar.center = (round(144 * scale_factor), round(144 * scale_factor))
+    pygame.draw.rect(display, (48, 48, 48), bar, 1)
+    bar.width = round(bar.width * progress)
+    pygame.draw.rect(display, (255, 255, 255), bar)
+
+
+def show_loading_screen(
+    display: pygame.Surface,
+    canvas: TextureCanvas | None,
+    progress: float,
+    scale_factor: float,
+):
+    if canvas is None:
+        draw_loading_screen(display, progress, scale_factor)
+        pygame.display.flip()
+    else:
+        # A new surface every time, the canvas expects the ones it draws not to change
+        screen = pygame.Surface(display.get_size())
+        draw_loading_screen(screen, progress, scale_factor)
+        canvas.present([(screen, (0, 0))])
+
+
 async def main():
     if sys.platform == "emscripten":
         platform.window.canvas.style.imageRendering = "pixelated"
 
-    pygame.init()
+    with trace.span("pygame.init"):
+        pygame.init()
     pygame.display.set_caption("Shooter do Mau")
     pygame.mouse.set_visible(False)
 
@@ -46,7 +79,17 @@ async def main():
         round(size[1] * scale_factor),
     )
     window_size = (display_size[0], display_size[1] + round(100 * scale_factor))
-    display = pygame.display.set_mode(window_size)
+    with trace.span("display"):
+        renderer = None
+        if RENDER_BACKEND == "texture":
+            renderer = create_renderer("Shooter do Mau", window_size)
+        if renderer is None:
+            display = pygame.display.set_mode(window_size)
+            canvas = None
+        else:
+            # Nothing is drawn on the display, the renderer composes the frames
+            display = pygame.Surface(window_size)
+            canvas = TextureCanvas(renderer, scale_factor)
     clock = pygame.time.Clock()
     running = True
     keybindings: engine.Keybindings = engine.default_keybindings | {
@@ -55,187 +98,295 @@ async def main():
         pygame.K_s: engine.Direction.DOWN,
         pygame.K_d: engine.Direction.RIGHT,
     }
-    game = ShooterGame(build_info(), size, scale_factor, ["assets"], keybindings)
-    display.blit(pygame.transform.scale(game.screen, display_size), (0, 0))
+    # Show a progress bar while loading what the menu needs, letting the event loop
+    # (and the browser) run between the loading steps
+    with trace.span("assets"):
+        assets = GameAssets(["assets"], load=False)
+    show_loading_screen(display, canvas, 0.0, scale_factor)
+    trace.mark("first frame")
+    # The game modules are imported after the first frame is on screen
+    from shooter_game import DIRTY_RECTS, ShooterGame
+
+    # With a render thread the game only records what to draw
+    recording = None
+    if RENDER_THREAD and canvas is None and sys.platform != "emscripten":
+        recording = RecordingCanvas()
+
+    def new_game() -> ShooterGame:
+        return ShooterGame(
+            build_info(),
+            size,
+            scale_factor,
+            ["assets"],
+            keybindings,
+            assets,
+            # The renderer composes whole frames
+            dirty_rect_mode=DIRTY_RECTS and canvas is None,
+            canvas=canvas if canvas is not None else recording,
+        )
+
+    with trace.span("menu assets"):
+        for progress in assets.load_menu_assets():
+            await asyncio.sleep(0)
+            pygame.event.pump()
+            show_loading_screen(display, canvas, progress, scale_factor)
+    with trace.span("game"):
+        game = new_game()
+    upscaler = Upscaler(display, size, scale_factor)
+    render_thread = None
+    if recording is not None:
+        render_thread = RenderThread(size, upscaler)
+    elif canvas is None:
+        upscaler.update(game.screen)
+    else:
+        # The game pad is drawn over every frame
+        display.fill((0, 0, 0))
+        draw_game_pad(display, scale_factor)
+        pad_top = display_size[1]
+        pad = display.subsurface((0, pad_top, window_size[0], window_size[1] - pad_top))
+    # The other sprite sheets are loaded one per frame while the menu is shown
+    remaining_assets = assets.load_remaining_assets()
+
+    # Every capture session, their writers are only waited for when the game exits
+    captures: list[FrameCapture] = []
+
+    def start_capture() -> FrameCapture | None:
+        if canvas is not None or sys.platform == "emscripten":
+            print("Capture isn't available with the texture backend or in the browser")
+            return None
+        captures.append(FrameCapture.session(size))
+        return captures[-1]
+
+    capture = start_capture() if CAPTURE else None
+    capture_toggled = False
 
     events = []
     dir_finger_id = -1
     fire_finger_id = -1
-    while running:
-        events.clear()
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                running = False
-            elif (
-                event.type == pygame.KEYDOWN or event.type == pygame.KEYUP
-            ) and event.unicode == " ":
-                events.append(event)
-            elif (
-                event.type == pygame.FINGERDOWN
-                or event.type == pygame.FINGERUP
-                or event.type == pygame.FINGERMOTION
-            ):
-                if event.type == pygame.FINGERMOTION or event.type == pygame.FINGERDOWN:
-                    rect_position_dir = (
-                        round(0 * scale_factor),
-                        round(288 * scale_factor),
-                    )  # Top-left corner of the rectangle
-                    rect_position_fire = (
-                        round(144 * scale_factor),
-                        round(288 * scale_factor),
-                    )  # Top-left corner of the rectangle
-                    rect_size = (
-                        round(144 * scale_factor),
-                        round(100 * scale_factor),
-                    )  # Width and height of the rectangle
-                    dir_pad = pygame.Rect(*rect_position_dir, *rect_size)
-                    fire_pad = pygame.Rect(*rect_position_fire, *rect_size)
-                    touch_x = round(event.x * window_size[0])
-                    touch_y = round(event.y * window_size[1])
+    # The render thread and the capture writers are stopped however the loop ends
+    try:
+        while running:
+            events.clear()
+            for event in pygame.event.get():
+                if event.type == pygame.QUIT:
+                    running = False
+                elif (
+                    event.type == pygame.KEYDOWN or event.type == pygame.KEYUP
+                ) and event.unicode == " ":
+                    events.append(event)
+                elif event.type == pygame.KEYDOWN and event.key == CAPTURE_KEY:
+                    capture_toggled = True
+                elif (
+                    event.type == pygame.FINGERDOWN
+                    or event.type == pygame.FINGERUP
+                    or event.type == pygame.FINGERMOTION
+                ):
                     if (
-                        dir_pad.collidepoint(touch_x, touch_y)
-                        and event.finger_id != fire_finger_id
+                        event.type == pygame.FINGERMOTION
+                        or event.type == pygame.FINGERDOWN
                     ):
-                        dir_finger_id = event.finger_id
-                        direction = pygame.Vector2(touch_x, touch_y) - pygame.Vector2(
-                            dir_pad.center
-                        )
-                        if direction.length() > 15:
-                            angle = -direction.angle_to(pygame.Vector2(1, 0))
-                            if -22.5 < angle <= 22.5:
-                                events.append(
-                                    pygame.event.Event(
-                                        pygame.USEREVENT,
-                                        {
-                                            "direction": engine.Direction.RIGHT,
-                                            "fire": None,
-                                        },
+                        rect_position_dir = (
+                            round(0 * scale_factor),
+                            round(288 * scale_factor),
+                        )  # Top-left corner of the rectangle
+                        rect_position_fire = (
+                            round(144 * scale_factor),
+                            round(288 * scale_factor),
+                        )  # Top-left corner of the rectangle
+                        rect_size = (
+                            round(144 * scale_factor),
+                            round(100 * scale_factor),
+                        )  # Width and height of the rectangle
+                        dir_pad = pygame.Rect(*rect_position_dir, *rect_size)
+                        fire_pad = pygame.Rect(*rect_position_fire, *rect_size)
+                        touch_x = round(event.x * window_size[0])
+                        touch_y = round(event.y * window_size[1])
+                        if (
+                            dir_pad.collidepoint(touch_x, touch_y)
+                            and event.finger_id != fire_finger_id
+                        ):
+                            dir_finger_id = event.finger_id
+                            direction = pygame.Vector2(
+                                touch_x, touch_y
+                            ) - pygame.Vector2(dir_pad.center)
+                            if direction.length() > 15:
+                                angle = -direction.angle_to(pygame.Vector2(1, 0))
+                                if -22.5 < angle <= 22.5:
+                                    events.append(
+                                        pygame.event.Event(
+                                            pygame.USEREVENT,
+                                            {
+                                                "direction": engine.Direction.RIGHT,
+                                                "fire": None,
+                                            },
+                                        )
                                     )
-                                )
-                            elif 22.5 < angle <= 67.5:
-                                events.append(
-                                    pygame.event.Event(
-                                        pygame.USEREVENT,
-                                        {
-                                            "direction": engine.Direction.RIGHT
-                                            | engine.Direction.DOWN,
-                                            "fire": None,
-                                        },
+                                elif 22.5 < angle <= 67.5:
+                                    events.append(
+                                        pygame.event.Event(
+                                            pygame.USEREVENT,
+                                            {
+                                                "direction": engine.Direction.RIGHT
+                                                | engine.Direction.DOWN,
+                                                "fire": None,
+                                            },
+                                        )
                                     )
-                                )
-                            elif 67.5 < angle <= 112.5:
-                                events.append(
-                                    pygame.event.Event(
-                                        pygame.USEREVENT,
-                                        {
-                                            "direction": engine.Direction.DOWN,
-                                            "fire": None,
-                                        },
+                                elif 67.5 < angle <= 112.5:
+                                    events.append(
+                                        pygame.event.Event(
+                                            pygame.USEREVENT,
+                                            {
+                                                "direction": engine.Direction.DOWN,
+                                                "fire": None,
+                                            },
+                                        )
                                     )
-                                )
-                            elif 112.5 < angle <= 157.5:
-                                events.append(
-                                    pygame.event.Event(
-                                        pygame.USEREVENT,
-                                        {
-                                            "direction": engine.Direction.LEFT
-                                            | engine.Direction.DOWN,
-                                            "fire": None,
-                                        },
+                                elif 112.5 < angle <= 157.5:
+                                    events.append(
+                                        pygame.event.Event(
+                                            pygame.USEREVENT,
+                                            {
+                                                "direction": engine.Direction.LEFT
+                                                | engine.Direction.DOWN,
+                                                "fire": None,
+                                            },
+                                        )
                                     )
-                                )
-                            elif 157.5 < angle or angle <= -157.5:
-                                events.append(
-                                    pygame.event.Event(
-                                        pygame.USEREVENT,
-                                        {
-                                            "direction": engine.Direction.LEFT,
-                                            "fire": None,
-                                        },
+                                elif 157.5 < angle or angle <= -157.5:
+                                    events.append(
+                                        pygame.event.Event(
+                                            pygame.USEREVENT,
+                                            {
+                                                "direction": engine.Direction.LEFT,
+                                                "fire": None,
+                                            },
+                                        )
                                     )
-                                )
-                            elif -157.5 < angle <= -112.5:
-                                events.append(
-                                    pygame.event.Event(
-                                        pygame.USEREVENT,
-                                        {
-                                            "direction": engine.Direction.LEFT
-                                            | engine.Direction.UP,
-                                            "fire": None,
-                                        },
+                                elif -157.5 < angle <= -112.5:
+                                    events.append(
+                                        pygame.event.Event(
+                                            pygame.USEREVENT,
+                                            {
+                                                "direction": engine.Direction.LEFT
+                                                | engine.Direction.UP,
+                                                "fire": None,
+                                            },
+                                        )
                                     )
-                                )
-                            elif -112.5 < angle <= -67.5:
-                                events.append(
-                                    pygame.event.Event(
-                                        pygame.USEREVENT,
-                                        {
-                                            "direction": engine.Direction.UP,
-                                            "fire": None,
-                                        },
+                                elif -112.5 < angle <= -67.5:
+                                    events.append(
+                                        pygame.event.Event(
+                                            pygame.USEREVENT,
+                                            {
+                                                "direction": engine.Direction.UP,
+                                                "fire": None,
+                                            },
+                                        )
                                     )
-                                )
-                            elif -67.5 < angle <= -22.5:
+                                elif -67.5 < angle <= -22.5:
+                                    events.append(
+                                        pygame.event.Event(
+                                            pygame.USEREVENT,
+                                            {
+                                                "direction": engine.Direction.RIGHT
+                                                | engine.Direction.UP,
+                                                "fire": None,
+                                            },
+                                        )
+                                    )
+                            else:
                                 events.append(
                                     pygame.event.Event(
                                         pygame.USEREVENT,
                                         {
-                                            "direction": engine.Direction.RIGHT
-                                            | engine.Direction.UP,
+                                            "direction": engine.Direction(0),
                                             "fire": None,
                                         },
                                     )
                                 )
-                        else:
+                        elif (
+                            fire_pad.collidepoint(touch_x, touch_y)
+                            and event.finger_id != dir_finger_id
+                        ):
+                            fire_finger_id = event.finger_id
+                            events.append(
+                                pygame.event.Event(
+                                    pygame.USEREVENT, {"direction": None, "fire": True}
+                                )
+                            )
+                    elif event.type == pygame.FINGERUP:
+                        if event.finger_id == dir_finger_id:
+                            dir_finger_id = -1
                             events.append(
                                 pygame.event.Event(
                                     pygame.USEREVENT,
                                     {"direction": engine.Direction(0), "fire": None},
                                 )
                             )
-                    elif (
-                        fire_pad.collidepoint(touch_x, touch_y)
-                        and event.finger_id != dir_finger_id
-                    ):
-                        fire_finger_id = event.finger_id
-                        events.append(
-                            pygame.event.Event(
-                                pygame.USEREVENT, {"direction": None, "fire": True}
-                            )
-                        )
-                elif event.type == pygame.FINGERUP:
-                    if event.finger_id == dir_finger_id:
-                        dir_finger_id = -1
-                        events.append(
-                            pygame.event.Event(
-                                pygame.USEREVENT,
-                                {"direction": engine.Direction(0), "fire": None},
-                            )
-                        )
-                    elif event.finger_id == fire_finger_id:
-                        fire_finger_id = -1
-                        events.append(
-                            pygame.event.Event(
-                                pygame.USEREVENT, {"direction": None, "fire": False}
+                        elif event.finger_id == fire_finger_id:
+                            fire_finger_id = -1
+                            events.append(
+                                pygame.event.Event(
+                                    pygame.USEREVENT, {"direction": None, "fire": False}
+                                )
                             )
-                        )
-
-        await asyncio.sleep(0)
-        dt = clock.tick(60) / 1000.0
-        fps = clock.get_fps()
-        try:
-            game.update(events, dt, fps)
-        except StopIteration:
-            old = game
-            game = ShooterGame(
-                build_info(), size, scale_factor, ["assets"], keybindings
-            )
-            game.hi_score = old.hi_score
-        display.blit(pygame.transform.scale(game.screen, display_size), (0, 0))
 
-        draw_game_pad(display, scale_factor)
+            await asyncio.sleep(0)
+            dt = clock.tick(60) / 1000.0
+            fps = clock.get_fps()
+            try:
+                game.update(events, dt, fps)
+            except StopIteration:
+                old = game
+                game = new_game()
+                game.hi_score = old.hi_score
+                if recording is not None:
+                    # Drop what the game over drew before stopping
+                    recording.take()
+            if canvas is not None:
+                canvas.present([(pad, (0, pad_top))])
+                updated, whole_screen = [], False
+            elif render_thread is not None:
+                # Shows the previous frame, rendered while this one was simulated
+                updated, whole_screen = render_thread.finish()
+            else:
+                updated = upscaler.update(game.screen, game.dirty_rects)
+                whole_screen = game.dirty_rects is None
+            if whole_screen and updated:
+                draw_game_pad(display, scale_factor)
 
-        pygame.display.flip()
+                pygame.display.flip()
+            elif updated:
+                pygame.display.update(updated)
+            if capture_toggled:
+                capture_toggled = False
+                if capture is None:
+                    capture = start_capture()
+                else:
+                    # Doesn't wait for the pending frames to be written
+                    capture.stop()
+                    capture = None
+            if capture is not None:
+                # The render thread's screen holds the frame just shown until the next
+                # one is submitted
+                capture.capture(
+                    render_thread.screen if render_thread is not None else game.screen
+                )
+            if render_thread is not None and recording is not None:
+                render_thread.submit(recording.take(), game.dirty_rects)
+
+            # The first game frame is interactive, the trace is only reported once
+            trace.finish("interactive")
+            next(remaining_assets, None)
+    finally:
+        # Even if stopping the render thread fails, the writers end
+        for session in captures:
+            session.stop()
+        if render_thread is not None:
+            render_thread.stop()
+        for session in captures:
+            session.wait()
 
 
 asyncio.run(main())
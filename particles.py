@@ -0,0 +1,134 @@
+"""
+Particles: explosions and debris.
+
+A particle is just an animation playing at a point moving in a straight line. Instead
+of a sprite with its own trajectory, animation and generators, every live particle
+is a row in a set of parallel arrays (position, velocity, animation timer, frame and
+kind), which are updated and queued for drawing in one loop per frame.
+"""
+
+import math
+import os
+import random
+from array import array
+from typing import Sequence
+
+import pygame
+
+from canvas import Canvas
+
+# Debris particles thrown by each destroyed enemy, 0 (the default) for none
+DEBRIS_PARTICLES = int(os.getenv("DEBRIS_PARTICLES", 0))
+
+
+def debris_frames() -> list[pygame.Surface]:
+    """A spark cooling down and shrinking."""
+    frames = []
+    for size, color in (
+        (2, (255, 255, 200)),
+        (2, (255, 200, 64)),
+        (1, (255, 128, 0)),
+        (1, (160, 64, 0)),
+    ):
+        frame = pygame.Surface((size, size))
+        frame.fill(color)
+        frames.append(frame)
+    return frames
+
+
+class ParticleSystem:
+    def __init__(self, seed: int | None = None) -> None:
+        # Animation of each kind of particle: the frames, their centering offsets
+        # and the delay between frames
+        self._frames: list[Sequence[pygame.Surface]] = []
+        self._offsets: list[list[tuple[int, int]]] = []
+        self._delays: list[float] = []
+        # One entry per live particle
+        self.x = array("d")
+        self.y = array("d")
+        self.vx = array("d")
+        self.vy = array("d")
+        self.timer = array("d")
+        self.frame = array("H")
+        self.kind = array("B")
+        # Separate from the random module, so bursts don't change the game's rolls
+        self.random = random.Random(seed)
+
+    def __len__(self) -> int:
+        return len(self.kind)
+
+    def add_kind(self, frames: Sequence[pygame.Surface], delay: float) -> int:
+        """Registers an animation particles can play, returning its kind."""
+        self._frames.append(frames)
+        self._offsets.append(
+            [(f.get_width() // 2, f.get_height() // 2) for f in frames]
+        )
+        self._delays.append(delay)
+        return len(self._frames) - 1
+
+    def emit(
+        self,
+        kind: int,
+        position: tuple[float, float],
+        velocity: tuple[float, float] = (0.0, 0.0),
+    ) -> None:
+        self.x.append(position[0])
+        self.y.append(position[1])
+        self.vx.append(velocity[0])
+        self.vy.append(velocity[1])
+        self.timer.append(0.0)
+        self.frame.append(0)
+        self.kind.append(kind)
+
+    def burst(
+        self,
+        kind: int,
+        position: tuple[float, float],
+        count: int,
+        speed: float,
+        drift: tuple[float, float] = (0.0, 0.0),
+    ) -> None:
+        """Emits particles in random directions, up to speed plus the drift."""
+        for _ in range(count):
+            angle = self.random.uniform(0.0, 2.0 * math.pi)
+            magnitude = self.random.uniform(0.3, 1.0) * speed
+            velocity = (
+                drift[0] + math.cos(angle) * magnitude,
+                drift[1] + math.sin(angle) * magnitude,
+            )
+            self.emit(kind, position, velocity)
+
+    def update(self, dt: float) -> None:
+        """Moves and animates the particles, dropping the finished ones."""
+        x, y, vx, vy = self.x, self.y, self.vx, self.vy
+        timer, frame, kind = self.timer, self.frame, self.kind
+        delays = self._delays
+        last_frames = [len(frames) - 1 for frames in self._frames]
+        # Compacts the live particles in place, keeping their order
+        live = 0
+        for i in range(len(kind)):
+            k = kind[i]
+            f = frame[i]
+            t = timer[i] + dt
+            if t >= delays[k]:
+                t = 0.0
+                if f >= last_frames[k]:
+                    continue
+                f += 1
+            x[live] = x[i] + vx[i] * dt
+            y[live] = y[i] + vy[i] * dt
+            vx[live] = vx[i]
+            vy[live] = vy[i]
+            timer[live] = t
+            frame[live] = f
+            kind[live] = k
+            live += 1
+        for column in (x, y, vx, vy, timer, frame, kind):
+            del column[live:]
+
+    def queue(self, canvas: Canvas) -> None:
+        """Queues the current frame of every particle, centered on its position."""
+        frames, offsets = self._frames, self._offsets
+        for x, y, f, k in zip(self.x, self.y, self.frame, self.kind):
+            offset_x, offset_y = offsets[k][f]
+            canvas.queue(frames[k][f], (int(x) - offset_x, int(y) - offset_y))
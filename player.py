@@ -4,6 +4,7 @@ from typing import Generator, Optional
 import pygame
 
 from animation import Animation
+from canvas import Canvas
 from engine import (
     Direction,
     KeyboardTrajectoryProvider,
@@ -13,7 +14,8 @@ from engine import (
 )
 from item import PowerCapsule
 from shot import Shot
-from surface_factory import SurfaceFactory, crop, white_out
+from surface_factory import SurfaceFactory
+from world import Camera
 
 
 class Cannon:
@@ -24,9 +26,7 @@ class Cannon:
         power_source: Optional["PowerSource"] = None,
     ) -> None:
         self.bullet_group = bullet_group
-        self.bullet_anim = Animation.static(
-            crop(factory.surfaces["shots"][2], 7, 0, 2, 8)
-        )
+        self.bullet_anim = Animation.static(factory.crop("shots", 2, 7, 0, 2, 8))
         self.timer = 0.0
         self.power_source = power_source
         self.power_consumption = 10.0
@@ -115,9 +115,7 @@ class Turret:
         power_source: Optional["PowerSource"] = None,
     ) -> None:
         self.bullet_group = bullet_group
-        self.bullet_anim = Animation.static(
-            crop(factory.surfaces["shots"][1], 7, 7, 2, 2)
-        )
+        self.bullet_anim = Animation.static(factory.crop("shots", 1, 7, 7, 2, 2))
         self.timer = 0.0
         self.power_source = power_source
         self._upgrade_level = 0
@@ -159,9 +157,7 @@ class Minigun(Turret):
         power_source: Optional["PowerSource"] = None,
     ) -> None:
         super().__init__(factory, bullet_group, power_source)
-        self.bullet_anim = Animation.static(
-            crop(factory.surfaces["shots"][1], 7, 7, 2, 2)
-        )
+        self.bullet_anim = Animation.static(factory.crop("shots", 1, 7, 7, 2, 2))
         self._upgrade_path = [
             (0.05, 5.0),
             (0.035, 1.5),
@@ -185,9 +181,7 @@ class FlakCannon(Turret):
         power_source: Optional["PowerSource"] = None,
     ) -> None:
         super().__init__(factory, bullet_group, power_source)
-        self.bullet_anim = Animation.static(
-            crop(factory.surfaces["shots"][1], 7, 7, 2, 2)
-        )
+        self.bullet_anim = Animation.static(factory.crop("shots", 1, 7, 7, 2, 2))
         self._upgrade_path = [
             (0.5, 20.0),
             (0.3, 15.0),
@@ -267,26 +261,14 @@ class Player(TrajectorySprite):
         keyboard: KeyboardTrajectoryProvider,
         virtual_keyboard: VirtualKeyboard,
         *groups: pygame.sprite.AbstractGroup,
+        camera: Optional[Camera] = None,
     ) -> None:
         self.scale_factor = scale_factor
+        # The mouse is on the screen, the ship in the world seen by the camera
+        self.camera = camera
         self.left_anim = Animation(factory.surfaces["player-ship-l"], 0.1, loop=True)
         self.neutral_anim = Animation(factory.surfaces["player-ship"], 0.1, loop=True)
         self.right_anim = Animation(factory.surfaces["player-ship-r"], 0.1, loop=True)
-        self.left_anim_white_out = Animation(
-            [white_out(surface) for surface in factory.surfaces["player-ship-l"]],
-            0.1,
-            loop=True,
-        )
-        self.neutral_anim_white_out = Animation(
-            [white_out(surface) for surface in factory.surfaces["player-ship"]],
-            0.1,
-            loop=True,
-        )
-        self.right_anim_white_out = Animation(
-            [white_out(surface) for surface in factory.surfaces["player-ship-r"]],
-            0.1,
-            loop=True,
-        )
         super().__init__(self.neutral_anim, None, keyboard, *groups)
         self.virtual_keyboard = virtual_keyboard
         self.shooting_enabled = True
@@ -297,7 +279,6 @@ class Player(TrajectorySprite):
         self._shield: Optional[Shield] = None
         self.equip(power_source=PowerSource())
         self.controls_enabled = True
-        self.white_out_timer = 0.0
         self.generator = self._main_loop()
         next(self.generator)
 
@@ -305,7 +286,7 @@ class Player(TrajectorySprite):
         super().update(dt)
         self.generator.send(dt)
 
-    def draw_power_bar(self, screen: pygame.Surface) -> None:
+    def draw_power_bar(self, canvas: Canvas) -> pygame.Rect:
         # Define the size and position of the power bar
         bar_width = self.rect.width
         bar_x = self.rect.x
@@ -321,10 +302,10 @@ class Player(TrajectorySprite):
         filled_width = int(bar_width * min(current_power, 100.0) / 100.0)
 
         # Draw the background of the bar (empty part)
-        pygame.draw.rect(screen, (255, 0, 0), (bar_x, bar_y, bar_width, 1))
+        canvas.fill((255, 0, 0), pygame.Rect(bar_x, bar_y, bar_width, 1))
 
         # Draw the filled part of the bar
-        pygame.draw.rect(screen, (0, 255, 0), (bar_x, bar_y, filled_width, 1))
+        canvas.fill((0, 255, 0), pygame.Rect(bar_x, bar_y, filled_width, 1))
 
         extra_power = current_power - capacity
         if extra_power > 0:
@@ -332,12 +313,14 @@ class Player(TrajectorySprite):
             extra_filled_width = int(bar_width * min(extra_power, 100.0) / 100.0)
 
             # Draw the background of the extra power bar (empty part)
-            pygame.draw.rect(screen, (0, 127, 255), (bar_x, bar_y + 2, bar_width, 1))
+            canvas.fill((0, 127, 255), pygame.Rect(bar_x, bar_y + 2, bar_width, 1))
 
             # Draw the filled part of the extra power bar
-            pygame.draw.rect(
-                screen, (0, 255, 255), (bar_x, bar_y + 2, extra_filled_width, 1)
+            canvas.fill(
+                (0, 255, 255), pygame.Rect(bar_x, bar_y + 2, extra_filled_width, 1)
             )
+            return pygame.Rect(bar_x, bar_y, bar_width, 3)
+        return pygame.Rect(bar_x, bar_y, bar_width, 1)
 
     def equip(
         self,
@@ -405,9 +388,10 @@ class Player(TrajectorySprite):
     def _calculate_shooting_angle(self) -> float:
         mouse_pos = pygame.mouse.get_pos()
         player_pos = self.rect.center
+        offset_x, offset_y = self.camera.offset if self.camera else (0, 0)
         aim_vector = (
-            mouse_pos[0] / self.scale_factor - player_pos[0],
-            mouse_pos[1] / self.scale_factor - player_pos[1],
+            mouse_pos[0] / self.scale_factor + offset_x - player_pos[0],
+            mouse_pos[1] / self.scale_factor + offset_y - player_pos[1],
         )
         if aim_vector == (0, 0):
             aim_vector = (1, 0)
@@ -437,22 +421,13 @@ class Player(TrajectorySprite):
             if (
                 keys[pygame.K_LEFT] and not keys[pygame.K_RIGHT]
             ) or self.virtual_keyboard.direction == Direction.LEFT:
-                if self.white_out_timer > 0.0:
-                    self.set_animation(self.left_anim_white_out, None)
-                else:
-                    self.set_animation(self.left_anim, None)
+                self.set_animation(self.left_anim, None)
             elif (
                 keys[pygame.K_RIGHT] and not keys[pygame.K_LEFT]
             ) or self.virtual_keyboard.direction == Direction.RIGHT:
-                if self.white_out_timer > 0.0:
-                    self.set_animation(self.right_anim_white_out, None)
-                else:
-                    self.set_animation(self.right_anim, None)
+                self.set_animation(self.right_anim, None)
             else:
-                if self.white_out_timer > 0.0:
-                    self.set_animation(self.neutral_anim_white_out, None)
-                else:
-                    self.set_animation(self.neutral_anim, None)
+                self.set_animation(self.neutral_anim, None)
             if keys[pygame.K_SPACE] or self.virtual_keyboard.fire:
                 self._shoot_cannon()
             # if we are not running in the browser, we can use the mouse buttons
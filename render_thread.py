@@ -0,0 +1,151 @@
+"""
+Pipelined rendering.
+
+Set RENDER_THREAD=1 to draw the frames in a separate thread. The game then draws on a
+RecordingCanvas, which only records the drawing commands (which surfaces go where),
+and each frame's commands are replayed onto a screen owned by the render thread,
+then scaled into the display, while the next frame is being simulated. The surfaces
+referenced by the commands are never drawn into, so nothing is copied.
+
+SDL releases the GIL while blitting and scaling, so both threads can run at once on
+multi-core machines. The display is only flipped, and the events pumped, on the main
+thread, as SDL requires on some platforms. The frames are shown one frame later.
+"""
+
+import os
+import queue
+import threading
+from typing import Any
+
+import pygame
+
+from canvas import Canvas, SurfaceCanvas, points_bounds
+from surface_cache import surface_lock
+from upscaler import Upscaler
+
+RENDER_THREAD = os.getenv("RENDER_THREAD", "False").lower() in ("true", "1", "t")
+
+# A canvas method name and its arguments
+Command = tuple[str, tuple[Any, ...]]
+
+
+class RecordingCanvas:
+    """A canvas recording what's drawn on it, to be replayed on another canvas."""
+
+    def __init__(self) -> None:
+        self._commands: list[Command] = []
+        self._queued: list[pygame.Rect] = []
+
+    def take(self) -> tuple[Command, ...]:
+        """The commands recorded since the last time, which are forgotten."""
+        commands = tuple(self._commands)
+        self._commands = []
+        return commands
+
+    def blit(
+        self,
+        surface: pygame.Surface,
+        dest: tuple[int, int] | pygame.Rect,
+        area: pygame.Rect | None = None,
+    ) -> pygame.Rect:
+        rect = pygame.Rect(dest[0], dest[1], *(area or surface.get_rect()).size)
+        area = None if area is None else pygame.Rect(area)
+        self._commands.append(("blit", (surface, rect.topleft, area)))
+        return rect
+
+    def fill(self, color: tuple[int, int, int], rect: pygame.Rect) -> pygame.Rect:
+        self._commands.append(("fill", (color, pygame.Rect(rect))))
+        return pygame.Rect(rect)
+
+    def rect(self, color: tuple[int, int, int], rect: pygame.Rect) -> pygame.Rect:
+        self._commands.append(("rect", (color, pygame.Rect(rect))))
+        return pygame.Rect(rect)
+
+    def lines(
+        self, color: tuple[int, int, int], points: list[tuple[int, int]]
+    ) -> pygame.Rect:
+        self._commands.append(("lines", (color, list(points))))
+        return points_bounds(points)
+
+    def queue(self, surface: pygame.Surface, dest: tuple[int, int]) -> None:
+        # The position is copied, sprites move the rect they pass as the destination
+        self._commands.append(("queue", (surface, (dest[0], dest[1]))))
+        self._queued.append(pygame.Rect(dest[0], dest[1], *surface.get_size()))
+
+    def queue_sprites(
+        self, group: pygame.sprite.AbstractGroup, offset: tuple[int, int] = (0, 0)
+    ) -> None:
+        x, y = offset
+        for sprite in group.sprites():
+            self.queue(sprite.image, (sprite.rect.x - x, sprite.rect.y - y))
+
+    def flush(self) -> list[pygame.Rect]:
+        self._commands.append(("flush", ()))
+        drawn = self._queued
+        self._queued = []
+        return drawn
+
+
+def replay(commands: tuple[Command, ...], canvas: Canvas) -> None:
+    for name, args in commands:
+        getattr(canvas, name)(*args)
+
+
+class RenderThread:
+    """Replays recorded frames and scales them into the display in a thread."""
+
+    def __init__(self, size: tuple[int, int], upscaler: Upscaler) -> None:
+        self.screen = pygame.Surface(size)
+        self.canvas = SurfaceCanvas(self.screen)
+        self.upscaler = upscaler
+        self._frames: queue.Queue[
+            tuple[tuple[Command, ...], list[pygame.Rect] | None] | None
+        ] = queue.Queue(maxsize=1)
+        self._results: queue.Queue[tuple[list[pygame.Rect], bool] | BaseException] = (
+            queue.Queue()
+        )
+        self._pending = False
+        self._thread = threading.Thread(target=self._run, name="render", daemon=True)
+        self._thread.start()
+
+    def submit(
+        self, commands: tuple[Command, ...], dirty_rects: list[pygame.Rect] | None
+    ) -> None:
+        """
+        Starts rendering a frame, given the regions of the screen it changed (None if
+        all of them). Don't touch the display until it's finished.
+        """
+        self._frames.put((commands, dirty_rects))
+        self._pending = True
+
+    def finish(self) -> tuple[list[pygame.Rect], bool]:
+        """
+        Waits for the submitted frame, if any. Returns the regions of the display it
+        updated, and whether the whole screen was redrawn.
+        """
+        if not self._pending:
+            return [], False
+        self._pending = False
+        result = self._results.get()
+        if isinstance(result, BaseException):
+            raise result
+        return result
+
+    def stop(self) -> None:
+        # The thread ends even if the last frame failed
+        try:
+            self.finish()
+        finally:
+            self._frames.put(None)
+            self._thread.join()
+
+    def _run(self) -> None:
+        while (frame := self._frames.get()) is not None:
+            commands, dirty_rects = frame
+            try:
+                with surface_lock:
+                    replay(commands, self.canvas)
+                updated = self.upscaler.update(self.screen, dirty_rects)
+                self._results.put((updated, dirty_rects is None))
+            except BaseException as e:
+                self._results.put(e)
@@ -1,3 +1,4 @@
+import os
 import random
 from typing import Generator
 
@@ -6,8 +7,12 @@ import pygame.event
 
 import item
 from animation import Animation
+from canvas import Canvas, SurfaceCanvas
+from debug_overlay import DebugOverlay
 from enemy import Enemy, RedEnemy
 from engine import (
+    SPRITE_DEBUG,
+    AnimatedSprite,
     Keybindings,
     KeyboardTrajectoryProvider,
     MouseTrajectoryProvider,
@@ -15,11 +20,16 @@ from engine import (
     TrajectorySprite,
     VirtualKeyboard,
     default_keybindings,
+    frame_counters,
 )
+from game_assets import GameAssets
 from game_flow import GameFlow
+from particles import DEBRIS_PARTICLES, ParticleSystem, debris_frames
 from player import Cannon, FlakCannon, Minigun, Player, Shield, TurboLaser, Turret
 from shot import Shot
-from surface_factory import SurfaceFactory
+from world import SCROLL_SPEED, WORLD_HEIGHT, Camera, SpatialGrid, ViewCanvas
+
+DIRTY_RECTS = os.getenv("DIRTY_RECTS", "False").lower() in ("true", "1", "t")
 
 
 class CrossHair(TrajectorySprite):
@@ -40,22 +50,52 @@ class ShooterGame:
         scale_factor: float,
         asset_folders: list[str],
         keybindings: Keybindings = default_keybindings,
+        assets: GameAssets | None = None,
+        dirty_rect_mode: bool = DIRTY_RECTS,
+        canvas: Canvas | None = None,
+        world_size: tuple[int, int] | None = None,
+        scroll_speed: float = SCROLL_SPEED,
     ) -> None:
         self.build_info = build_info
         self.scale_factor = scale_factor
         self.screen = pygame.Surface(size)
-        self.factory = SurfaceFactory(asset_folders)
+        # Everything is drawn through the canvas, by default onto the screen
+        self.canvas = canvas if canvas is not None else SurfaceCanvas(self.screen)
+        # The sprites are in world coordinates, drawn through the camera's view, while
+        # the HUD is drawn on the canvas directly
+        if world_size is None:
+            world_size = (size[0], WORLD_HEIGHT or size[1])
+        self.camera = Camera(size, pygame.Rect((0, 0), world_size), scroll_speed)
+        self.view = ViewCanvas(self.canvas, self.camera)
+        # Entities placed in the stage wait in the grid until the camera gets near,
+        # then they're in their groups until they leave its active area
+        self.stage = SpatialGrid()
+        self._placed: dict[AnimatedSprite, tuple[pygame.sprite.AbstractGroup, ...]] = {}
+        # In dirty rect mode only the regions drawn in the previous frame are cleared
+        # and dirty_rects lists the regions that changed in the last update (None if
+        # it was the whole screen)
+        self.dirty_rect_mode = dirty_rect_mode
+        self.dirty_rects: list[pygame.Rect] | None = None
+        self._drawn: list[pygame.Rect] = []
+        self._previously_drawn: list[pygame.Rect] | None = None
+        # Pass the assets of the previous game to restart without reloading them
+        self.assets = assets if assets is not None else GameAssets(asset_folders)
+        self.factory = self.assets.factory
         self.keybindings = keybindings
         self.virtual_keyboard = VirtualKeyboard()
-        self.font = pygame.font.Font("assets/mystery-font.ttf", 12)
-        self.small_font = pygame.font.Font("assets/mystery-font.ttf", 8)
-        self.bg = pygame.image.load("bg/nebula_288.png").convert()
-        self.bg.set_alpha(96)
+        self.font = self.assets.font
+        self.small_font = self.assets.small_font
+        self.text = self.assets.text
+        self.small_text = self.assets.small_text
+        self.debug_overlay = DebugOverlay(self.small_text) if SPRITE_DEBUG else None
         self.player_group = pygame.sprite.RenderPlain()
         self.crosshair_group = pygame.sprite.RenderPlain()
         self.player_bullet_group = pygame.sprite.RenderPlain()
         self.enemy_group = pygame.sprite.RenderPlain()
-        self.explosion_group = pygame.sprite.RenderPlain()
+        # Explosions and debris
+        self.particles = ParticleSystem()
+        self._explosion_kind: int | None = None
+        self._debris_kind = self.particles.add_kind(debris_frames(), 0.08)
         self.enemy_bullet_group = pygame.sprite.RenderPlain()
         self.item_group = pygame.sprite.RenderPlain()
         self._create_player()
@@ -73,10 +113,71 @@ class ShooterGame:
     def update(self, events: list[pygame.event.Event], dt: float, fps: float) -> None:
         for g in self.generators:
             g.send((events, dt, fps))
+        frame_counters.end_frame()
+        self._end_frame()
+
+    def _clear(self) -> None:
+        background = self.assets.background(self.screen.get_size())
+        if not self.dirty_rect_mode or self._previously_drawn is None:
+            self.canvas.blit(background, (0, 0))
+            return
+        for rect in self._previously_drawn:
+            self.canvas.blit(background, rect, rect)
+
+    def _blit(self, surface: pygame.Surface, coord: tuple[int, int]) -> None:
+        self.canvas.queue(surface, coord)
+
+    def _draw(self, group: pygame.sprite.AbstractGroup) -> None:
+        self.view.queue_sprites(group)
+
+    def _flush(self) -> None:
+        """Draws what was queued since the last flush, in a single batch."""
+        self._drawn.extend(self.canvas.flush())
+
+    def _draw_debug_overlay(self) -> None:
+        assert self.debug_overlay is not None
+        # The overlay goes on top of everything else
+        self._flush()
+        groups = {
+            "players": self.player_group,
+            "enemies": self.enemy_group,
+            "items": self.item_group,
+            "shots": self.player_bullet_group,
+            "bullets": self.enemy_bullet_group,
+        }
+        counts = {name: len(group) for name, group in groups.items()}
+        counts["particles"] = len(self.particles)
+        counts["stage"] = len(self.stage)
+        self._drawn.extend(
+            self.debug_overlay.draw(
+                self.canvas,
+                self.view,
+                groups.values(),
+                counts,
+                self.screen.get_height(),
+            )
+        )
+
+    def _end_frame(self) -> None:
+        self._flush()
+        screen_rect = self.screen.get_rect()
+        drawn = [r.clip(screen_rect) for r in self._drawn]
+        drawn = [r for r in drawn if r.width > 0 and r.height > 0]
+        if not self.dirty_rect_mode or self._previously_drawn is None:
+            self.dirty_rects = None
+        else:
+            self.dirty_rects = self._previously_drawn + drawn
+        self._previously_drawn = drawn
+        self._drawn = []
 
     def _create_player(self) -> None:
-        boundary = self.screen.get_rect().copy()
-        boundary.update(10, 10, boundary.width - 20, boundary.height - 22)
+        boundary = self.camera.rect.copy()
+        boundary.update(
+            boundary.left + 10,
+            boundary.top + 10,
+            boundary.width - 20,
+            boundary.height - 22,
+        )
         keyboard = KeyboardTrajectoryProvider(
             boundary,
             boundary.center,
@@ -85,12 +186,14 @@ class ShooterGame:
             self.keybindings,
             self.virtual_keyboard,
         )
+        self.keyboard = keyboard
         self.player = Player(
             self.scale_factor,
             self.factory,
             keyboard,
             self.virtual_keyboard,
             self.player_group,
+            camera=self.camera,
         )
         turret = Turret(self.factory, self.player_bullet_group)
         self.player.equip(
@@ -108,36 +211,74 @@ class ShooterGame:
         return CrossHair(crosshair_anim, 0.0, mouse, self.crosshair_group)
 
     def _clean_up_oob_stuff(self) -> None:
+        # The entities near the camera are updated, so their bullets and the ones that
+        # can still hit them are kept
+        view = self.camera.active_area()
         for b in self.player_bullet_group:
-            if not self.screen.get_rect().colliderect(b.rect):
+            if not view.colliderect(b.rect):
                 b.kill()
         for b in self.enemy_bullet_group:
-            if not self.screen.get_rect().colliderect(b.rect):
+            if not view.colliderect(b.rect):
                 b.kill()
         for i in self.item_group:
-            if not self.screen.get_rect().colliderect(i.rect):
+            if not view.colliderect(i.rect):
                 i.kill()
 
+    def place(self, sprite: AnimatedSprite) -> None:
+        """
+        Places an entity, created in its groups, in the stage at its current position.
+        It's only in the groups, to be updated and drawn, while it's near the camera.
+        """
+        groups = tuple(sprite.groups())
+        # Not killed: it is back in its groups before its next update, where sprites
+        # that are no longer alive stop following their trajectory
+        sprite.remove(*groups)
+        self.stage.insert(sprite, *groups)
+
+    def is_placed(self, sprite: AnimatedSprite) -> bool:
+        """Whether an entity in its groups was placed in the stage."""
+        return sprite in self._placed
+
+    def _scroll(self, dt: float) -> None:
+        moved = self.camera.scroll(dt)
+        if moved:
+            # The player's ship moves along with the camera
+            self.keyboard.boundary.move_ip(0, moved)
+            self.keyboard.position.y += moved
+
+    def _update_stage(self) -> None:
+        """Activates the placed entities near the camera, deactivates the others."""
+        area = self.camera.active_area()
+        for sprite, groups in self._placed.copy().items():
+            if not sprite.alive():
+                del self._placed[sprite]
+            elif not area.collidepoint(sprite.rect.center):
+                del self._placed[sprite]
+                sprite.remove(*groups)
+                self.stage.insert(sprite, *groups)
+        for sprite, groups in self.stage.take(area):
+            sprite.add(*groups)
+            self._placed[sprite] = groups
+
     def _explode(self, sprite: TrajectorySprite, explosion_speed: float = 0.0):
         sprite.kill()
-        explosion_frames = self.factory.surfaces["explosion"] + list(
-            reversed(self.factory.surfaces["explosion"])
-        )
+        if self._explosion_kind is None:
+            explosion_frames = self.factory.ping_pong("explosion")
+            self._explosion_kind = self.particles.add_kind(explosion_frames, 0.03)
         if isinstance(sprite.trajectory_provider, StraightTrajectoryProvider):
             trajectory_angle = -sprite.trajectory_provider.get_direction().angle_to(
                 pygame.Vector2(1, 0)
             )
         else:
             trajectory_angle = None
-        straight = StraightTrajectoryProvider(
-            start=sprite.rect.center,
-            end=None,
-            angle=sprite.angle if not trajectory_angle else trajectory_angle,
-            speed=explosion_speed,
-        )
-        TrajectorySprite(
-            Animation(explosion_frames, 0.03), None, straight, self.explosion_group
-        ).on_animation_end(lambda s: s.kill())
+        angle = sprite.angle if not trajectory_angle else trajectory_angle
+        direction = pygame.Vector2(1, 0).rotate(angle).normalize()
+        velocity = (direction.x * explosion_speed, direction.y * explosion_speed)
+        self.particles.emit(self._explosion_kind, sprite.rect.center, velocity)
+        if isinstance(sprite, Enemy) and DEBRIS_PARTICLES > 0:
+            self.particles.burst(
+                self._debris_kind, sprite.rect.center, DEBRIS_PARTICLES, 60.0, velocity
+            )
         # Some chance of enemy dropping a power capsule
         if isinstance(sprite, RedEnemy):
             random_angle = random.uniform(-45.0, 45.0)
@@ -241,52 +382,48 @@ class ShooterGame:
                         )
 
     def draw_progress(self) -> None:
-        text = self.font.render(f"{self.progress}", False, (255, 255, 255))
+        text = self.text.render(f"{self.progress}", (255, 255, 255))
         coord = (5, 5)
-        self.screen.blit(text, coord)
+        self._blit(text, coord)
 
     def draw_fps(self, fps: float) -> None:
-        text = self.small_font.render(f"{fps:.1f}", False, (255, 255, 255))
+        text = self.small_text.render(f"{fps:.1f}", (255, 255, 255))
         coord = (5, 288 - text.get_height())
-        self.screen.blit(text, coord)
+        self._blit(text, coord)
 
     def draw_score(self) -> None:
         color = "white"
         if self.score >= self.hi_score:
             color = "yellow"
-        text = self.font.render(f"{self.score}", False, color)
+        text = self.text.render(f"{self.score}", color)
         coord = ((self.screen.get_width() - text.get_width()) // 2, 5)
-        self.screen.blit(text, coord)
+        self._blit(text, coord)
 
     def draw_hi_score(self) -> None:
-        text = self.font.render(f"HI {self.hi_score}", False, (255, 255, 255))
+        text = self.text.render(f"HI {self.hi_score}", (255, 255, 255))
         coord = (self.screen.get_width() - text.get_width() - 5, 5)
-        self.screen.blit(text, coord)
+        self._blit(text, coord)
 
     def draw_messages(self) -> None:
-        texts = [
-            self.font.render(m, False, (255, 255, 255)) for m in self.player_messages
-        ]
+        texts = [self.text.render(m, (255, 255, 255)) for m in self.player_messages]
         gap = 5
         total_height = sum(t.get_height() for t in texts) + gap * (len(texts) - 1)
         top = (self.screen.get_height() - total_height) // 2
         for i, _ in enumerate(self.player_messages):
             text = texts[i]
             left = (self.screen.get_width() - text.get_width()) // 2
-            self.screen.blit(text, (left, top))
+            self._blit(text, (left, top))
             top += text.get_height() + gap
 
     def _render_menu(self) -> Generator[None, float, None]:
         mode = 1  # 0: blink, 1: show
-        text = self.font.render("Hit the space bar to start.", False, (255, 255, 255))
+        text = self.text.render("Hit the space bar to start.", (255, 255, 255))
         coord = (
             self.screen.get_rect().centerx - text.get_width() // 2,
             self.screen.get_rect().centery - text.get_height() // 2,
         )
         if self.build_info is not None:
-            build_info_text = self.small_font.render(
-                self.build_info, False, (255, 255, 255)
-            )
+            build_info_text = self.small_text.render(self.build_info, (255, 255, 255))
             build_info_coord = (
                 self.screen.get_width() - build_info_text.get_width() - 5,
                 self.screen.get_height() - build_info_text.get_height() - 5,
@@ -295,7 +432,7 @@ class ShooterGame:
         while True:
             dt = yield
             if mode == 1:
-                self.screen.blit(text, coord)
+                self._blit(text, coord)
                 if frame_count <= 0:
                     if random.randint(0, 10) < 4:
                         mode = 0
@@ -309,10 +446,10 @@ class ShooterGame:
                     mode = 1
                     frame_count = 100
             if self.build_info is not None:
-                self.screen.blit(build_info_text, build_info_coord)
+                self._blit(build_info_text, build_info_coord)
             frame_count -= 1
             self.crosshair_group.update(dt)
-            self.crosshair_group.draw(self.screen)
+            self.canvas.queue_sprites(self.crosshair_group)
             self.draw_hi_score()
 
     def _virtual_keyboard_loop(
@@ -335,8 +472,7 @@ class ShooterGame:
         mode = 0  # 0, 1: menu, 10: game, 20, 21: game over
         while True:
             events, dt, fps = yield  # yields dt every time the game is updated
-            self.screen.fill((0, 0, 0))
-            self.screen.blit(self.bg, (0, 0))
+            self._clear()
             if mode == 0 or mode == 1:
                 self.menu_generator.send(dt)
                 for event in events:
@@ -357,30 +493,37 @@ class ShooterGame:
                     elif mode == 1 and not self.virtual_keyboard.fire:
                         mode = 10
             elif mode == 10 or mode == 20 or mode == 21:
+                self._scroll(dt)
+                self._update_stage()
                 game_flow.update(dt)
-                self.explosion_group.update(dt)
+                self.particles.update(dt)
                 self.enemy_group.update(dt)
                 self.player_group.update(dt)
                 self.crosshair_group.update(dt)
                 self.enemy_bullet_group.update(dt)
                 self.player_bullet_group.update(dt)
                 self.item_group.update(dt)
-                self.item_group.draw(self.screen)
-                self.enemy_group.draw(self.screen)
-                self.player_group.draw(self.screen)
-                self.crosshair_group.draw(self.screen)
-                self.player_bullet_group.draw(self.screen)
-                self.enemy_bullet_group.draw(self.screen)
-                self.explosion_group.draw(self.screen)
+                self._draw(self.item_group)
+                self._draw(self.enemy_group)
+                self._draw(self.player_group)
+                # The crosshair follows the mouse on the screen
+                self.canvas.queue_sprites(self.crosshair_group)
+                self._draw(self.player_bullet_group)
+                self._draw(self.enemy_bullet_group)
+                self.particles.queue(self.view)
+                # The power bars go on top of the sprites
+                self._flush()
                 for enemy in self.enemy_group.sprites():
-                    enemy.draw_power_bar(self.screen)
+                    self._drawn.append(enemy.draw_power_bar(self.view))
                 for player in self.player_group.sprites():
-                    player.draw_power_bar(self.screen)
+                    self._drawn.append(player.draw_power_bar(self.view))
                 self.draw_fps(fps)
                 self.draw_progress()
                 self.draw_score()
                 self.draw_hi_score()
                 self.draw_messages()
+                if self.debug_overlay is not None:
+                    self._draw_debug_overlay()
                 self._check_bullet_collision()
                 self._check_item_collision()
                 # Kill bullets that are out of bounds
@@ -388,17 +531,13 @@ class ShooterGame:
                 if (
                     mode == 10
                     and len(self.player_group) == 0
-                    and len(self.explosion_group) == 0
+                    and len(self.particles) == 0
                 ):
                     mode = 20
                     game_over_timer = 10.0
                 if mode == 20 or mode == 21:
-                    text = self.font.render(
-                        "Game Over.",
-                        False,
-                        (255, 255, 255),
-                    )
-                    self.screen.blit(
+                    text = self.text.render("Game Over.", (255, 255, 255))
+                    self._blit(
                         text,
                         (
                             self.screen.get_rect().centerx - text.get_width() // 2,
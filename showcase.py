@@ -1,12 +1,24 @@
 import argparse
 import os
 
+# Imported first, so it can time the other imports
+from startup_trace import trace
+
 import pygame
 from pygame.sprite import RenderPlain
 
 from animation import Animation
-from engine import KeyboardTrajectoryProvider, MouseTrajectoryProvider, TrajectorySprite
+from canvas import SurfaceCanvas
+from debug_overlay import DebugOverlay
+from engine import (
+    SPRITE_DEBUG,
+    KeyboardTrajectoryProvider,
+    MouseTrajectoryProvider,
+    TrajectorySprite,
+)
+from hud_text import HudText
 from surface_factory import SurfaceFactory, trim
+from upscaler import Upscaler
 
 
 def render_all(
@@ -97,24 +109,30 @@ if __name__ == "__main__":
     width, height = map(int, args.dimensions.split("x"))
 
     scale_factor = float(os.getenv("SCALE_FACTOR", 2.0))
-    pygame.init()
+    with trace.span("pygame.init"):
+        pygame.init()
     screen = pygame.Surface((width, height))
-    display = pygame.display.set_mode(
-        (
-            round(screen.get_width() * scale_factor),
-            round(screen.get_height() * scale_factor),
+    with trace.span("display"):
+        display = pygame.display.set_mode(
+            (
+                round(screen.get_width() * scale_factor),
+                round(screen.get_height() * scale_factor),
+            )
         )
-    )
+    upscaler = Upscaler(display, screen.get_size(), scale_factor)
     pygame.display.set_caption("Showcase")
     pygame.mouse.set_visible(False)
     font = pygame.font.Font("assets/mystery-font.ttf", 8)
+    canvas = SurfaceCanvas(screen)
+    debug_overlay = DebugOverlay(HudText(font)) if SPRITE_DEBUG else None
     clock = pygame.time.Clock()
     running = True
 
-    factory = SurfaceFactory(["assets"])
-    animation = dict()
-    for name, frames in factory.surfaces.items():
-        animation[name] = Animation(frames, 0.1, loop=True)
+    with trace.span("assets"):
+        factory = SurfaceFactory(["assets"])
+        animation = dict()
+        for name, frames in factory.surfaces.items():
+            animation[name] = Animation(frames, 0.1, loop=True)
     dt = 0.0
 
     player_trajectory_provider = KeyboardTrajectoryProvider(
@@ -161,9 +179,20 @@ if __name__ == "__main__":
         reticle_group.update(dt)
         reticle_group.draw(screen)
 
+        if debug_overlay is not None:
+            debug_overlay.draw(
+                canvas,
+                canvas,
+                [player_group, reticle_group],
+                {"sprites": len(player_group) + len(reticle_group)},
+                screen.get_height(),
+            )
+            canvas.flush()
+
         # flip() the display to put your work on screen
-        display.blit(pygame.transform.scale(screen, display.get_size()), (0, 0))
-        pygame.display.flip()
+        if upscaler.update(screen):
+            pygame.display.flip()
+        trace.finish("first frame")
 
         # limits FPS to 60
         # dt is delta time in seconds since last frame, used for framerate-
@@ -1,12 +1,19 @@
 import os
 from enum import IntEnum
 
+# Imported first, so it can time the other imports
+from startup_trace import trace
+
 import pygame
 from pygame.sprite import RenderPlain
 
 import engine
 from animation import Animation
+from canvas import SurfaceCanvas
+from debug_overlay import DebugOverlay
+from hud_text import HudText
 from surface_factory import SurfaceFactory
+from upscaler import Upscaler
 
 
 class ToolMode(IntEnum):
@@ -19,14 +26,17 @@ tool_mode = ToolMode.SHOW_LINES
 
 if __name__ == "__main__":
     scale_factor = float(os.getenv("SCALE_FACTOR", 2.0))
-    pygame.init()
+    with trace.span("pygame.init"):
+        pygame.init()
     screen = pygame.Surface((288, 288))
-    display = pygame.display.set_mode(
-        (
-            round(screen.get_width() * scale_factor),
-            round(screen.get_height() * scale_factor),
+    with trace.span("display"):
+        display = pygame.display.set_mode(
+            (
+                round(screen.get_width() * scale_factor),
+                round(screen.get_height() * scale_factor),
+            )
         )
-    )
+    upscaler = Upscaler(display, screen.get_size(), scale_factor)
     pygame.display.set_caption("Spline Tool")
     mouse_pos = pygame.mouse.get_pos()
     clock = pygame.time.Clock()
@@ -38,8 +48,14 @@ if __name__ == "__main__":
     dragging_rect = None
     ctrl_rects: list[pygame.Rect] = list()
     trajectory = None
-    factory = SurfaceFactory(["assets"])
+    with trace.span("assets"):
+        factory = SurfaceFactory(["assets"])
     group: RenderPlain = RenderPlain()
+    canvas = SurfaceCanvas(screen)
+    debug_overlay = None
+    if engine.SPRITE_DEBUG:
+        font = pygame.font.Font("assets/mystery-font.ttf", 8)
+        debug_overlay = DebugOverlay(HudText(font))
 
     while running:
         # pygame.QUIT event means the user clicked X to close your window
@@ -95,9 +111,7 @@ if __name__ == "__main__":
             if len(ctrl_rects) > 1:
 
                 def explode(sprite: engine.TrajectorySprite):
-                    frames = factory.surfaces["explosion"][:]
-                    frames.reverse()
-                    frames = factory.surfaces["explosion"] + frames
+                    frames = factory.ping_pong("explosion")
                     sprite.set_animation(Animation(frames, 0.03))
                     sprite.on_animation_end(lambda s: s.kill())
                     # sprite.trajectory_provider = (
@@ -152,8 +166,15 @@ if __name__ == "__main__":
         group.update(dt)
         group.draw(screen)
 
-        display.blit(pygame.transform.scale(screen, display.get_size()), (0, 0))
-        pygame.display.flip()
+        if debug_overlay is not None:
+            debug_overlay.draw(
+                canvas, canvas, [group], {"ships": len(group)}, screen.get_height()
+            )
+            canvas.flush()
+
+        if upscaler.update(screen):
+            pygame.display.flip()
+        trace.finish("first frame")
 
         # limits FPS to 60
         # dt is delta time in seconds since last frame, used for framerate-
@@ -0,0 +1,114 @@
+"""
+Startup trace.
+
+Set STARTUP_TRACE=1 to print how long the startup steps of a game entry point took
+(module imports, pygame initialization, display creation, asset loading, first frame),
+or set it to a file path to write the trace to that file instead. Import this module
+before anything else so it can time the other imports.
+"""
+
+import importlib.abc
+import importlib.machinery
+import os
+import sys
+import time
+from contextlib import contextmanager
+from types import ModuleType
+from typing import Iterator, Sequence
+
+STARTUP_TRACE = os.getenv("STARTUP_TRACE", "")
+
+
+class _ImportTimer(importlib.abc.MetaPathFinder):
+    """Finds modules with the other finders and times the execution of each one."""
+
+    def __init__(self, trace: "StartupTrace") -> None:
+        self.trace = trace
+
+    def find_spec(
+        self,
+        fullname: str,
+        path: Sequence[str] | None,
+        target: ModuleType | None = None,
+    ) -> importlib.machinery.ModuleSpec | None:
+        for finder in sys.meta_path:
+            if finder is self or not hasattr(finder, "find_spec"):
+                continue
+            spec = finder.find_spec(fullname, path, target)
+            if spec is not None:
+                break
+        else:
+            return None
+        loader = spec.loader
+        # Built-in and frozen modules are loaded by classes shared by every module
+        if loader is None or isinstance(loader, type):
+            return spec
+        exec_module = loader.exec_module
+
+        def timed_exec_module(module: ModuleType) -> None:
+            with self.trace.span(f"import {fullname}"):
+                exec_module(module)
+
+        setattr(loader, "exec_module", timed_exec_module)
+        return spec
+
+
+class StartupTrace:
+    def __init__(self, output: str = STARTUP_TRACE) -> None:
+        self.enabled = output.lower() not in ("false", "0", "f", "")
+        # "true", "1" or "t" prints the trace, anything else is the file to write it to
+        self.output = output
+        self.start = time.perf_counter()
+        # Start (seconds since the trace started), duration, nesting depth and name
+        self.events: list[tuple[float, float, int, str]] = []
+        self.finished = False
+        self._depth = 0
+        self._import_timer = _ImportTimer(self)
+        if self.enabled:
+            sys.meta_path.insert(0, self._import_timer)
+
+    @contextmanager
+    def span(self, name: str) -> Iterator[None]:
+        """Times the enclosed block."""
+        if not self.enabled:
+            yield
+            return
+        start = time.perf_counter()
+        index = len(self.events)
+        self.events.append((start - self.start, 0.0, self._depth, name))
+        self._depth += 1
+        try:
+            yield
+        finally:
+            self._depth -= 1
+            duration = time.perf_counter() - start
+            self.events[index] = (start - self.start, duration, self._depth, name)
+
+    def mark(self, name: str) -> None:
+        """Records the time elapsed since the start of the trace."""
+        if self.enabled:
+            now = time.perf_counter() - self.start
+            self.events.append((now, 0.0, self._depth, name))
+
+    def finish(self, name: str) -> None:
+        """Marks the end of the startup and reports the trace, only the first time."""
+        if self.finished:
+            return
+        self.finished = True
+        if not self.enabled:
+            return
+        self.mark(name)
+        if self._import_timer in sys.meta_path:
+            sys.meta_path.remove(self._import_timer)
+        lines = ["   start ms  duration ms"] + [
+            f"{start * 1000:11.1f} {duration * 1000:12.1f}  {'  ' * depth}{name}"
+            for start, duration, depth, name in self.events
+        ]
+        if self.output.lower() in ("true", "1", "t"):
+            print("\n".join(lines))
+        else:
+            with open(self.output, "w") as f:
+                f.write("\n".join(lines) + "\n")
+
+
+trace = StartupTrace()
@@ -0,0 +1,129 @@
+import os
+import threading
+from collections import OrderedDict
+from typing import Callable, Hashable
+
+import pygame
+
+from surface_factory import NORMALIZE_SURFACES, normalize, white_out, white_out_indexed
+from surface_memory import memory, surface_bytes
+
+ROTATION_RESOLUTION = float(os.getenv("ROTATION_RESOLUTION", 1.0))
+ROTATION_CACHE_SIZE = int(os.getenv("ROTATION_CACHE_SIZE", 4096))
+
+# Deriving a surface locks its source, which drops the RLE encoding of an RLE
+# accelerated source until it's unlocked. A thread blitting the same surfaces
+# meanwhile must hold this lock while doing so.
+surface_lock = threading.Lock()
+
+
+class SurfaceCache:
+    """
+    Least recently used cache of surfaces derived from other surfaces.
+
+    The cached surfaces are shared by everyone asking for the same key, so they
+    must never be drawn into. Besides holding at most `max_entries` surfaces, the
+    cache gives up its least recently used ones when the memory registry is over
+    budget. The new surfaces are normalized for blitting if `normalized`.
+    """
+
+    def __init__(self, max_entries: int, normalized: bool = NORMALIZE_SURFACES) -> None:
+        self.max_entries = max_entries
+        self.normalized = normalized
+        self._entries: OrderedDict[Hashable, pygame.Surface] = OrderedDict()
+        # When each entry was last used, in memory registry ticks
+        self._last_used: dict[Hashable, int] = dict()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def hit_ratio(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def get(
+        self, key: Hashable, create: Callable[[], pygame.Surface]
+    ) -> pygame.Surface:
+        surface = self._entries.get(key)
+        if surface is not None:
+            self._entries.move_to_end(key)
+            self._last_used[key] = memory.tick()
+            self.hits += 1
+            return surface
+        self.misses += 1
+        with surface_lock:
+            surface = create()
+            if self.normalized:
+                surface = normalize(surface)
+        self._entries[key] = surface
+        self._last_used[key] = memory.tick()
+        self.bytes += surface_bytes(surface)
+        if len(self._entries) > self.max_entries:
+            self.evict_oldest()
+        memory.enforce()
+        return surface
+
+    def oldest_use(self) -> int | None:
+        oldest = next(iter(self._entries), None)
+        return None if oldest is None else self._last_used[oldest]
+
+    def evict_oldest(self) -> None:
+        key, surface = self._entries.popitem(last=False)
+        del self._last_used[key]
+        self.bytes -= surface_bytes(surface)
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._last_used.clear()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def __repr__(self) -> str:
+        return (
+            f"{type(self).__name__}(entries={len(self)}, hits={self.hits}, "
+            f"misses={self.misses}, hit_ratio={self.hit_ratio:.2f}, bytes={self.bytes})"
+        )
+
+
+class RotationCache(SurfaceCache):
+    """
+    Rotated versions of sprite frames, keyed by the source frame and the rotation
+    angle quantized to `resolution` degrees.
+    """
+
+    def __init__(self, resolution: float = 1.0, max_entries: int = 4096) -> None:
+        super().__init__(max_entries)
+        self.resolution = resolution
+
+    def quantize(self, angle: float) -> float:
+        if self.resolution > 0.0:
+            angle = round(angle / self.resolution) * self.resolution
+        return angle % 360.0
+
+    def rotate(self, surface: pygame.Surface, angle: float) -> pygame.Surface:
+        quantized = self.quantize(angle)
+        if quantized == 0.0:
+            return surface
+        return self.get(
+            (surface, quantized), lambda: pygame.transform.rotate(surface, quantized)
+        )
+
+
+class WhiteOutCache(SurfaceCache):
+    """White silhouettes of sprite frames, used for the hit flash."""
+
+    def white_out(self, surface: pygame.Surface) -> pygame.Surface:
+        if surface.get_bitsize() == 8:
+            return self.get(surface, lambda: white_out_indexed(surface))
+        return self.get(surface, lambda: white_out(surface))
+
+
+rotation_cache = RotationCache(ROTATION_RESOLUTION, ROTATION_CACHE_SIZE)
+white_out_cache = WhiteOutCache(1024)
+memory.register_cache("rotated", rotation_cache)
+memory.register_cache("white-out", white_out_cache)
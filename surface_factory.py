@@ -1,8 +1,23 @@
 import os
-from typing import Generator
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Generator, Iterable, Iterator, Mapping, TypeVar, cast
 
 import pygame
 
+import asset_pack
+from surface_memory import memory, surface_bytes
+
+T = TypeVar("T")
+
+ASSET_WORKERS = int(os.getenv("ASSET_WORKERS", 0))
+INDEXED_COLOR = os.getenv("INDEXED_COLOR", "False").lower() in ("true", "1", "t")
+NORMALIZE_SURFACES = os.getenv("NORMALIZE_SURFACES", "True").lower() in (
+    "true",
+    "1",
+    "t",
+)
+
 
 def slice_image(
     image: pygame.Surface,
@@ -15,52 +30,32 @@ def slice_image(
     for y in range(0, image.get_height(), height):
         for x in range(0, image.get_width(), width):
             slice = image.subsurface(pygame.Rect(x, y, width, height))
-            if skip_blanks:
-                found = False
-                # skip blank slices
-                for pixel_x in range(slice.get_width()):
-                    for pixel_y in range(slice.get_height()):
-                        if slice.get_at((pixel_x, pixel_y))[3] != 0:
-                            found = True
-                if found:
-                    yield slice
-            else:
+            # skip blank slices (the bounding rect of a fully transparent slice is empty)
+            if not skip_blanks or slice.get_bounding_rect().width > 0:
                 yield slice
 
 
 def trim(image: pygame.Surface) -> pygame.Surface:
-    left = 0
-    right = image.get_width()
-    top = 0
-    bottom = image.get_height()
-    for x in range(image.get_width()):
-        for y in range(image.get_height()):
-            if image.get_at((x, y))[3] != 0:
-                left = x
-                break
-        if left != 0:
-            break
-    for x in range(image.get_width() - 1, -1, -1):
-        for y in range(image.get_height()):
-            if image.get_at((x, y))[3] != 0:
-                right = x
-                break
-        if right != image.get_width():
-            break
-    for y in range(image.get_height()):
-        for x in range(image.get_width()):
-            if image.get_at((x, y))[3] != 0:
-                top = y
-                break
-        if top != 0:
-            break
-    for y in range(image.get_height() - 1, -1, -1):
-        for x in range(image.get_width()):
-            if image.get_at((x, y))[3] != 0:
-                bottom = y
-                break
-        if bottom != image.get_height():
-            break
+    bounds = image.get_bounding_rect()
+    if bounds.width == 0:
+        return image.subsurface(image.get_rect())
+    # These are the bounds the original pixel scan used to produce: an opaque first
+    # column (row) is skipped in favor of the next opaque one and the last opaque
+    # column (row) is left out. Kept as is so the trimmed sprites don't change.
+    left = bounds.left
+    if left == 0 and image.get_width() > 1:
+        rest = image.subsurface(
+            pygame.Rect(1, 0, image.get_width() - 1, image.get_height())
+        ).get_bounding_rect()
+        left = rest.left + 1 if rest.width > 0 else 0
+    top = bounds.top
+    if top == 0 and image.get_height() > 1:
+        rest = image.subsurface(
+            pygame.Rect(0, 1, image.get_width(), image.get_height() - 1)
+        ).get_bounding_rect()
+        top = rest.top + 1 if rest.height > 0 else 0
+    right = bounds.right - 1
+    bottom = bounds.bottom - 1
     return image.subsurface(pygame.Rect(left, top, right - left, bottom - top))
 
 
@@ -80,46 +75,323 @@ def white_out(original_surface: pygame.Surface) -> pygame.Surface:
     Returns:
         pygame.Surface: A new surface with the same dimensions as the original, where all non-transparent pixels are white.
     """
-    # Create a new surface with the same dimensions and pixel format as the original
-    white_surface = pygame.Surface(original_surface.get_size(), pygame.SRCALPHA)
-
-    # Lock the surfaces for pixel access
-    original_surface.lock()
-    white_surface.lock()
-
-    # Iterate over each pixel in the original surface
-    for x in range(original_surface.get_width()):
-        for y in range(original_surface.get_height()):
-            # Get the pixel color at (x, y)
-            color = original_surface.get_at((x, y))
-            # If the pixel is not transparent, draw it as white on the new surface
-            if color.a != 0:
-                white_surface.set_at((x, y), pygame.Color(255, 255, 255, color.a))
-
-    # Unlock the surfaces
-    original_surface.unlock()
-    white_surface.unlock()
+    # Opaque white where the original is not transparent, (0, 0, 0, 0) elsewhere
+    white_surface = pygame.mask.from_surface(original_surface, 0).to_surface(
+        setcolor=(255, 255, 255, 255), unsetcolor=(0, 0, 0, 0)
+    )
+    # Copy of the original with every color channel maxed out, keeping its alpha
+    alpha_surface = pygame.Surface(original_surface.get_size(), pygame.SRCALPHA)
+    alpha_surface.blit(original_surface, (0, 0), special_flags=pygame.BLEND_RGBA_MAX)
+    alpha_surface.fill((255, 255, 255, 0), special_flags=pygame.BLEND_RGB_MAX)
+    # White * alpha = the original alpha on white pixels
+    white_surface.blit(alpha_surface, (0, 0), special_flags=pygame.BLEND_RGBA_MULT)
+    return white_surface
 
+
+def white_out_indexed(original_surface: pygame.Surface) -> pygame.Surface:
+    """
+    Same as white_out for 8-bit surfaces: a copy of the pixels with every palette
+    entry but the transparent one turned white.
+    """
+    white_surface = original_surface.copy()
+    palette = original_surface.get_palette()
+    key = original_surface.get_colorkey()
+    white_surface.set_palette(
+        [color if color == key else (255, 255, 255) for color in palette]
+    )
     return white_surface
 
 
+class Palette:
+    """
+    Colors shared by the 8-bit sprite sheets. New colors are appended as sheets are
+    indexed, so the indices of the sheets indexed before stay valid. The first entry
+    is the color key, marking the transparent pixels.
+    """
+
+    def __init__(self, key: tuple[int, int, int] = (255, 0, 255)) -> None:
+        self.colors: list[tuple[int, int, int]] = [key]
+        self._indices = {key: 0}
+
+    @property
+    def key(self) -> tuple[int, int, int]:
+        return self.colors[0]
+
+    def index(self, image: pygame.Surface) -> pygame.Surface | None:
+        """
+        An 8-bit copy of the image using this palette, or None if the image has
+        semi-transparent pixels, uses the color key or doesn't fit in the palette.
+        """
+        # Every pixel as an RGBA byte quadruple read as one integer (alpha last)
+        pixels = set(memoryview(pygame.image.tobytes(image, "RGBA")).cast("I"))
+        if any(0 < pixel >> 24 < 255 for pixel in pixels):
+            return None
+        colors = {
+            (pixel & 0xFF, pixel >> 8 & 0xFF, pixel >> 16 & 0xFF)
+            for pixel in pixels
+            if pixel >> 24
+        }
+        new_colors = sorted(colors - self._indices.keys())
+        if self.key in colors or len(self.colors) + len(new_colors) > 256:
+            return None
+        for color in new_colors:
+            self._indices[color] = len(self.colors)
+            self.colors.append(color)
+        indexed = pygame.Surface(image.get_size(), 0, 8)
+        indexed.set_palette(self.colors)
+        indexed.fill(0)
+        for color in colors:
+            mask = pygame.mask.from_threshold(image, (*color, 255), (1, 1, 1, 1))
+            mask.to_surface(indexed, setcolor=color, unsetcolor=None)
+        # The threshold ignores alpha, so transparent pixels may have been painted
+        transparent = pygame.mask.from_surface(image, 0)
+        transparent.invert()
+        transparent.to_surface(indexed, setcolor=self.key, unsetcolor=None)
+        indexed.set_colorkey(0)
+        return indexed
+
+
+def has_translucent_pixels(surface: pygame.Surface) -> bool:
+    """Whether any pixel is neither fully transparent nor fully opaque."""
+    alphas = set(pygame.image.tobytes(surface, "RGBA")[3::4])
+    return not alphas <= {0, 255}
+
+
+def normalize(surface: pygame.Surface) -> pygame.Surface:
+    """
+    A standalone copy of the surface, the fastest to blit: in the display format for
+    32-bit surfaces and still 8-bit (so it stays small) for the palettized ones.
+
+    The copy is RLE accelerated, unless it has translucent pixels: SDL blends those
+    slightly differently when RLE encoded. The surface is returned as is if there
+    is no display yet.
+    """
+    if pygame.display.get_surface() is None:
+        return surface
+    if surface.get_bitsize() == 8:
+        result = surface.copy()
+        key = surface.get_colorkey()
+        if key is not None:
+            result.set_colorkey(key, pygame.RLEACCEL)
+    else:
+        result = surface.convert_alpha()
+        if not has_translucent_pixels(result):
+            result.set_alpha(255, pygame.RLEACCEL)
+    return result
+
+
+def decode(
+    name: str, dim: tuple[int, int]
+) -> tuple[pygame.Surface, list[pygame.Rect], float]:
+    """
+    Loads a sprite sheet and finds its non-blank slices. Doesn't need the display,
+    so it can run in any thread.
+
+    Returns:
+        The sheet, the slice rectangles and how long it took in seconds.
+    """
+    start = time.perf_counter()
+    image = pygame.image.load(name)
+    rects = [
+        pygame.Rect(s.get_offset(), s.get_size()) for s in slice_image(image, *dim)
+    ]
+    return image, rects, time.perf_counter() - start
+
+
+class LoadedOnDemand(Mapping[str, T]):
+    """Read-only view of the factory assets, loading each one on first access."""
+
+    def __init__(self, factory: "SurfaceFactory", loaded: dict[str, T]) -> None:
+        self._factory = factory
+        self._loaded = loaded
+
+    def __getitem__(self, key: str) -> T:
+        if key not in self._loaded:
+            self._factory.load(key)
+        return self._loaded[key]
+
+    def __contains__(self, key: object) -> bool:
+        return key in self._factory.keys
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._factory.keys)
+
+    def __len__(self) -> int:
+        return len(self._factory.keys)
+
+
 class SurfaceFactory:
-    def __init__(self, folders: list[str]) -> None:
-        self.raw_surfaces: dict[str, pygame.Surface] = dict()
-        self.surfaces: dict[str, list[pygame.Surface]] = dict()
-        for folder in folders:
-            files = [
-                os.path.join(folder, f)
-                for f in os.listdir(folder)
-                if os.path.isfile(os.path.join(folder, f))
-            ]
-            png_files = [f for f in files if f.endswith(".png")]
-            for name in png_files:
-                key = os.path.basename(name)[0:-4]
-                dim = (16, 16)
-                if key.endswith("_32"):
-                    key = key[0:-3]
-                    dim = (32, 32)
-                image = pygame.image.load(name).convert_alpha()
-                self.raw_surfaces[key] = image
-                self.surfaces[key] = list(slice_image(image, *dim))
+    def __init__(
+        self,
+        folders: list[str],
+        pack: str | None = asset_pack.DEFAULT_PACK,
+        lazy: bool = True,
+        workers: int = ASSET_WORKERS,
+        indexed: bool = INDEXED_COLOR,
+        rgba_keys: Iterable[str] = (),
+        normalized: bool = NORMALIZE_SURFACES,
+    ) -> None:
+        self._raw_surfaces: dict[str, pygame.Surface] = dict()
+        # The slices are subsurfaces of the sheets, the surfaces are the slices
+        # normalized for blitting (or the slices themselves if not normalized)
+        self._slices: dict[str, list[pygame.Surface]] = dict()
+        self._surfaces: dict[str, list[pygame.Surface]] = dict()
+        self.normalized = normalized
+        self.raw_surfaces = LoadedOnDemand(self, self._raw_surfaces)
+        self.surfaces = LoadedOnDemand(self, self._surfaces)
+        # Seconds it took to load each asset, in loading order
+        self.load_times: dict[str, float] = dict()
+        # Surfaces derived from the sliced ones, shared by every sprite using them
+        self._derived: dict[tuple, object] = dict()
+        # Bytes of pixel data held by the sheets, their slices and derived surfaces.
+        # Slices and crops are subsurfaces of the sheets, so they usually hold none.
+        self.sheet_bytes = 0
+        self.slice_bytes = 0
+        self.derived_bytes = 0
+        # Threads used to decode PNG files when preloading
+        self.workers = workers
+        # Shared palette of the 8-bit sheets, None to keep every sheet in RGBA.
+        # Sheets with semi-transparent pixels or listed in rgba_keys stay in RGBA.
+        self.palette = Palette() if indexed else None
+        self.rgba_keys = set(rgba_keys)
+        self.pack: asset_pack.AssetPack | None = None
+        if pack is not None and asset_pack.is_fresh(pack, folders):
+            self.pack = asset_pack.AssetPack(pack)
+            if self.pack.folders != folders:
+                self.pack = None
+        self._files = {
+            key: (name, dim) for key, name, dim in asset_pack.asset_files(folders)
+        }
+        memory.register(
+            "asset pack", lambda: surface_bytes(self.pack.atlas) if self.pack else 0
+        )
+        memory.register("sprite sheets", lambda: self.sheet_bytes)
+        memory.register("slices", lambda: self.slice_bytes)
+        memory.register("derived", lambda: self.derived_bytes)
+        if not lazy:
+            self.preload()
+
+    @property
+    def keys(self) -> list[str]:
+        return list(self._files)
+
+    @property
+    def loaded_keys(self) -> list[str]:
+        return list(self.load_times)
+
+    def load(self, key: str) -> None:
+        start = time.perf_counter()
+        if self.pack is not None:
+            image = self.pack.raw_surface(key)
+            slices = self.pack.slices(image, key)
+            indexed = self._index(key, image)
+            if indexed is not None:
+                image = indexed
+                slices = [
+                    image.subsurface(s.get_offset(), s.get_size()) for s in slices
+                ]
+            self._add(key, image, slices)
+            self.load_times[key] = time.perf_counter() - start
+        else:
+            self._store(key, *decode(*self._files[key]))
+
+    def preload(
+        self, keys: Iterable[str] | None = None, workers: int | None = None
+    ) -> None:
+        """
+        Loads the given assets (all of them if omitted) if not loaded yet.
+
+        With more than one worker, the PNG files are decoded and sliced by a thread
+        pool, while the conversion to the display format stays in this thread.
+        """
+        workers = self.workers if workers is None else workers
+        keys = [
+            k for k in (self.keys if keys is None else keys) if k not in self._surfaces
+        ]
+        if workers <= 1 or self.pack is not None or len(keys) <= 1:
+            for key in keys:
+                self.load(key)
+            return
+        with ThreadPoolExecutor(workers) as executor:
+            decoded = [executor.submit(decode, *self._files[key]) for key in keys]
+            for key, future in zip(keys, decoded):
+                self._store(key, *future.result())
+
+    def _store(
+        self,
+        key: str,
+        image: pygame.Surface,
+        rects: list[pygame.Rect],
+        decode_time: float,
+    ) -> None:
+        start = time.perf_counter()
+        image = image.convert_alpha()
+        image = self._index(key, image) or image
+        self._add(key, image, [image.subsurface(rect) for rect in rects])
+        self.load_times[key] = decode_time + time.perf_counter() - start
+
+    def _add(
+        self, key: str, image: pygame.Surface, slices: list[pygame.Surface]
+    ) -> None:
+        self._raw_surfaces[key] = image
+        self._slices[key] = slices
+        self._surfaces[key] = [self._normalize(s) for s in slices]
+        self.sheet_bytes += surface_bytes(image)
+        self.slice_bytes += sum(surface_bytes(s) for s in self._surfaces[key])
+
+    def _normalize(self, surface: pygame.Surface) -> pygame.Surface:
+        return normalize(surface) if self.normalized else surface
+
+    def _slice(self, name: str, index: int) -> pygame.Surface:
+        if name not in self._slices:
+            self.load(name)
+        return self._slices[name][index]
+
+    def _index(self, key: str, image: pygame.Surface) -> pygame.Surface | None:
+        if self.palette is None or key in self.rgba_keys:
+            return None
+        return self.palette.index(image)
+
+    def _derive(self, key: tuple, create: Callable[[], T]) -> T:
+        if key not in self._derived:
+            derived = create()
+            surfaces = derived if isinstance(derived, tuple) else (derived,)
+            self.derived_bytes += sum(
+                surface_bytes(s) for s in surfaces if isinstance(s, pygame.Surface)
+            )
+            self._derived[key] = derived
+        return cast(T, self._derived[key])
+
+    def crop(
+        self, name: str, index: int, x: int, y: int, width: int, height: int
+    ) -> pygame.Surface:
+        return self._derive(
+            ("crop", name, index, x, y, width, height),
+            lambda: self._normalize(
+                crop(self._slice(name, index), x, y, width, height)
+            ),
+        )
+
+    def crop_all(
+        self, name: str, x: int, y: int, width: int, height: int
+    ) -> tuple[pygame.Surface, ...]:
+        return self._derive(
+            ("crop_all", name, x, y, width, height),
+            lambda: tuple(
+                self.crop(name, i, x, y, width, height)
+                for i in range(len(self.surfaces[name]))
+            ),
+        )
+
+    def trim(self, name: str, index: int) -> pygame.Surface:
+        return self._derive(
+            ("trim", name, index),
+            lambda: self._normalize(trim(self._slice(name, index))),
+        )
+
+    def ping_pong(self, name: str) -> tuple[pygame.Surface, ...]:
+        """The frames of the given asset played forward, then backwards."""
+        return self._derive(
+            ("ping_pong", name),
+            lambda: tuple(self.surfaces[name]) + tuple(reversed(self.surfaces[name])),
+        )
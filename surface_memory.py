@@ -0,0 +1,103 @@
+"""
+Bookkeeping of the pixel memory held by the surface caches.
+
+Every cache registers how many bytes of pixel data it holds. The caches of derived
+surfaces (rotated images, white-out frames, text renders) can also be trimmed: when
+they hold more than the budget, their least recently used surfaces are evicted, across
+all of them, until it fits again. The memory that can't be evicted (the sprite sheets,
+the background) doesn't count against the budget, it's only reported.
+"""
+
+import os
+from typing import Callable, Protocol
+
+import pygame
+
+# Memory budget of the derived surfaces in kilobytes, 0 for no limit
+SURFACE_BUDGET_KB = int(os.getenv("SURFACE_BUDGET_KB", 0))
+
+
+def surface_bytes(surface: pygame.Surface) -> int:
+    """Bytes of pixel data owned by the surface, 0 for subsurfaces (they share it)."""
+    if surface.get_parent() is not None:
+        return 0
+    return surface.get_pitch() * surface.get_height()
+
+
+class Evictable(Protocol):
+    @property
+    def bytes(self) -> int: ...
+
+    def oldest_use(self) -> int | None:
+        """When the least recently used entry was last used, None if empty."""
+        ...
+
+    def evict_oldest(self) -> None: ...
+
+
+class MemoryRegistry:
+    def __init__(self, budget: int = 0) -> None:
+        # Bytes the derived surfaces are kept under by evicting them, 0 for no limit
+        self.budget = budget
+        self.evictions = 0
+        self._pools: dict[str, Callable[[], int]] = dict()
+        self._caches: dict[str, Evictable] = dict()
+        self._clock = 0
+
+    def tick(self) -> int:
+        """A counter ordering the uses of the entries of every cache."""
+        self._clock += 1
+        return self._clock
+
+    def register(self, name: str, size: Callable[[], int]) -> None:
+        """Tracks memory that can't be evicted, replacing any pool with that name."""
+        self._pools[name] = size
+
+    def register_cache(self, name: str, cache: Evictable) -> None:
+        self._caches[name] = cache
+
+    def totals(self) -> dict[str, int]:
+        return {name: size() for name, size in self._pools.items()} | {
+            name: cache.bytes for name, cache in self._caches.items()
+        }
+
+    @property
+    def total(self) -> int:
+        return sum(self.totals().values())
+
+    @property
+    def evictable(self) -> int:
+        """Bytes held by the derived surfaces, the ones the budget applies to."""
+        return sum(cache.bytes for cache in self._caches.values())
+
+    def enforce(self) -> None:
+        """
+        Evicts the least recently used derived surfaces until under budget, but never
+        the most recently used one, which was usually just created to be drawn.
+        """
+        if self.budget <= 0:
+            return
+        while self.evictable > self.budget:
+            candidates = [
+                c
+                for c in self._caches.values()
+                if c.oldest_use() not in (None, self._clock)
+            ]
+            if not candidates:
+                return
+            min(candidates, key=lambda c: c.oldest_use() or 0).evict_oldest()
+            self.evictions += 1
+
+    def report(self) -> str:
+        totals = self.totals()
+        lines = [f"{name:<16} {size / 1024:9.1f} KB" for name, size in totals.items()]
+        lines.append(f"{'total':<16} {sum(totals.values()) / 1024:9.1f} KB")
+        if self.budget > 0:
+            lines.append(
+                f"{'budget':<16} {self.budget / 1024:9.1f} KB for the derived "
+                f"surfaces ({self.evictable / 1024:.1f} KB), {self.evictions} evictions"
+            )
+        return "\n".join(lines)
+
+
+memory = MemoryRegistry(SURFACE_BUDGET_KB * 1024)
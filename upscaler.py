@@ -0,0 +1,77 @@
+import pygame
+
+
+class Upscaler:
+    """
+    Scales a low resolution screen into the top left of the display (or any other
+    surface) in place, instead of allocating a scaled copy every frame.
+
+    With an integer scale factor the changed regions can be scaled on their own,
+    as every source pixel maps to a whole block of target pixels. Otherwise the
+    whole screen is scaled whenever anything changed.
+    """
+
+    def __init__(
+        self, target: pygame.Surface, source_size: tuple[int, int], scale_factor: float
+    ) -> None:
+        self.scale_factor = scale_factor
+        self.integer_factor = int(scale_factor) if scale_factor.is_integer() else None
+        self.source_rect = pygame.Rect((0, 0), source_size)
+        self.target = target.subsurface(self._scale_rect(self.source_rect))
+        self._previous: bytes | None = None
+
+    def _scale_rect(self, rect: pygame.Rect) -> pygame.Rect:
+        left = round(rect.left * self.scale_factor)
+        top = round(rect.top * self.scale_factor)
+        return pygame.Rect(
+            left,
+            top,
+            round(rect.right * self.scale_factor) - left,
+            round(rect.bottom * self.scale_factor) - top,
+        )
+
+    def update(
+        self, source: pygame.Surface, rects: list[pygame.Rect] | None = None
+    ) -> list[pygame.Rect]:
+        """
+        Scales the given regions of the source into the target, or all of it if
+        None, skipping the work if the source didn't change since the last update.
+
+        Returns:
+            The regions of the target that were updated, empty if none.
+        """
+        if rects is None:
+            pixels = source.get_view("2").raw
+            if pixels == self._previous:
+                return []
+            self._previous = pixels
+            rects = [self.source_rect]
+        else:
+            # The previous pixels are only kept up to date for whole updates
+            self._previous = None
+            if not rects:
+                return []
+            if self.integer_factor is None:
+                rects = [self.source_rect]
+        # Scaling in place needs both surfaces in the same pixel format
+        in_place = (
+            source.get_bitsize() == self.target.get_bitsize()
+            and source.get_masks() == self.target.get_masks()
+        )
+        updated = []
+        for rect in rects:
+            scaled = self._scale_rect(rect)
+            if scaled.width <= 0 or scaled.height <= 0:
+                continue
+            if self.integer_factor == 1:
+                self.target.blit(source, rect, rect)
+            elif in_place:
+                region = source.subsurface(rect)
+                pygame.transform.scale(
+                    region, scaled.size, self.target.subsurface(scaled)
+                )
+            else:
+                region = source.subsurface(rect)
+                self.target.blit(pygame.transform.scale(region, scaled.size), scaled)
+            updated.append(scaled)
+        return updated
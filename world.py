@@ -0,0 +1,159 @@
+"""
+Worlds larger than the screen.
+
+The sprites live in world coordinates and the camera is the part of the world shown on
+the screen, drawn through a ViewCanvas. Set WORLD_HEIGHT to play in a taller world and
+SCROLL_SPEED to have the camera move up through it, from the bottom.
+
+A stage places its entities in a SpatialGrid up front. Only the ones near the camera
+(in its view plus a margin) are taken out of the grid and added to their groups, to be
+updated and drawn, and they go back to the grid when they leave that area. Finding
+them only looks at the grid cells around the camera, so the frame time depends on how
+many entities are near the camera, not on how many the stage has.
+"""
+
+import os
+
+import pygame
+
+from canvas import Canvas
+from engine import AnimatedSprite
+
+# World height in pixels, 0 for the screen height
+WORLD_HEIGHT = int(os.getenv("WORLD_HEIGHT", 0))
+# Pixels per second the camera moves up
+SCROLL_SPEED = float(os.getenv("SCROLL_SPEED", 0.0))
+
+
+class Camera:
+    def __init__(
+        self,
+        size: tuple[int, int],
+        world: pygame.Rect,
+        scroll_speed: float = 0.0,
+        margin: int = 32,
+    ) -> None:
+        self.world = world
+        # The part of the world shown, starting at the bottom
+        self.rect = pygame.Rect((0, 0), size)
+        self.rect.midbottom = world.midbottom
+        self.rect.clamp_ip(world)
+        self.scroll_speed = scroll_speed
+        self.margin = margin
+        self._y = float(self.rect.y)
+
+    @property
+    def offset(self) -> tuple[int, int]:
+        return self.rect.topleft
+
+    def active_area(self) -> pygame.Rect:
+        """
+        The view plus the margin, inside the world, where the entities are updated and
+        drawn. It's the view itself when the world is the size of the screen.
+        """
+        return self.rect.inflate(2 * self.margin, 2 * self.margin).clip(self.world)
+
+    def scroll(self, dt: float) -> int:
+        """Moves up until the top of the world, returning the pixels moved."""
+        self._y = max(self._y - self.scroll_speed * dt, float(self.world.top))
+        moved = round(self._y) - self.rect.y
+        self.rect.y += moved
+        return moved
+
+    def to_world(self, position: tuple[int, int]) -> tuple[int, int]:
+        """World coordinates of a position on the screen."""
+        return (position[0] + self.rect.x, position[1] + self.rect.y)
+
+
+class SpatialGrid:
+    """Sprites bucketed by the grid cell their center falls in, with their groups."""
+
+    def __init__(self, cell_size: int = 64) -> None:
+        self.cell_size = cell_size
+        self._cells: dict[
+            tuple[int, int],
+            list[tuple[AnimatedSprite, tuple[pygame.sprite.AbstractGroup, ...]]],
+        ] = {}
+        self._count = 0
+
+    def __len__(self) -> int:
+        return self._count
+
+    def insert(
+        self, sprite: AnimatedSprite, *groups: pygame.sprite.AbstractGroup
+    ) -> None:
+        x, y = sprite.rect.center
+        cell = (x // self.cell_size, y // self.cell_size)
+        self._cells.setdefault(cell, []).append((sprite, groups))
+        self._count += 1
+
+    def take(
+        self, area: pygame.Rect
+    ) -> list[tuple[AnimatedSprite, tuple[pygame.sprite.AbstractGroup, ...]]]:
+        """Removes and returns the sprites centered in the area."""
+        taken = []
+        size = self.cell_size
+        for cx in range(area.left // size, (area.right - 1) // size + 1):
+            for cy in range(area.top // size, (area.bottom - 1) // size + 1):
+                entries = self._cells.get((cx, cy))
+                if not entries:
+                    continue
+                kept = []
+                for entry in entries:
+                    if area.collidepoint(entry[0].rect.center):
+                        taken.append(entry)
+                    else:
+                        kept.append(entry)
+                if kept:
+                    self._cells[(cx, cy)] = kept
+                else:
+                    del self._cells[(cx, cy)]
+        self._count -= len(taken)
+        return taken
+
+
+class ViewCanvas:
+    """
+    Draws on a canvas in world coordinates, as seen by the camera. The areas returned
+    are on the screen.
+    """
+
+    def __init__(self, canvas: Canvas, camera: Camera) -> None:
+        self.canvas = canvas
+        self.camera = camera
+
+    def blit(
+        self,
+        surface: pygame.Surface,
+        dest: tuple[int, int] | pygame.Rect,
+        area: pygame.Rect | None = None,
+    ) -> pygame.Rect:
+        x, y = self.camera.offset
+        return self.canvas.blit(surface, (dest[0] - x, dest[1] - y), area)
+
+    def fill(self, color: tuple[int, int, int], rect: pygame.Rect) -> pygame.Rect:
+        x, y = self.camera.offset
+        return self.canvas.fill(color, rect.move(-x, -y))
+
+    def rect(self, color: tuple[int, int, int], rect: pygame.Rect) -> pygame.Rect:
+        x, y = self.camera.offset
+        return self.canvas.rect(color, rect.move(-x, -y))
+
+    def lines(
+        self, color: tuple[int, int, int], points: list[tuple[int, int]]
+    ) -> pygame.Rect:
+        x, y = self.camera.offset
+        return self.canvas.lines(color, [(px - x, py - y) for px, py in points])
+
+    def queue(self, surface: pygame.Surface, dest: tuple[int, int]) -> None:
+        x, y = self.camera.offset
+        self.canvas.queue(surface, (dest[0] - x, dest[1] - y))
+
+    def queue_sprites(
+        self, group: pygame.sprite.AbstractGroup, offset: tuple[int, int] = (0, 0)
+    ) -> None:
+        x, y = self.camera.offset
+        self.canvas.queue_sprites(group, (offset[0] + x, offset[1] + y))
+
+    def flush(self) -> list[pygame.Rect]:
+        return self.canvas.flush()